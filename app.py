@@ -4,40 +4,44 @@ Combines FastAPI backend and Streamlit frontend in a single app
 """
 
 import streamlit as st
-import requests
+import asyncio
+import io
+import queue
 import uuid
-import json
 import os
-import tempfile
-import subprocess
+import sys
 import threading
-import time
-from pathlib import Path
-from typing import List, Dict, Any
+from typing import Dict, Any, Iterator
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Import backend components
-try:
-    import sys
-    import os
-    # Add backend to path
-    backend_path = os.path.join(os.path.dirname(__file__), 'backend')
+# Add backend to path
+backend_path = os.path.join(os.path.dirname(__file__), 'backend')
+if backend_path not in sys.path:
     sys.path.insert(0, backend_path)
 
+# Streamlit re-runs this script on every interaction. Backend resources are
+# loaded once per process through st.cache_resource instead.
+@st.cache_resource(show_spinner="Loading embedding model and document index...")
+def load_backend():
+    """Import the agent graph and warm the embedding model and FAISS index"""
     from app.agent.graph import app_graph
-    from app.rag.ingest import ingest_document
-    from langchain_core.messages import HumanMessage
-    from app.core.config import settings
+    from app.rag.vector_store import get_embeddings, get_vector_store
 
-    BACKEND_AVAILABLE = True
+    get_embeddings()
+    get_vector_store()
     logger.info("Backend components loaded successfully")
-except ImportError as e:
-    logger.warning(f"Backend not available: {e}")
-    BACKEND_AVAILABLE = False
+    return app_graph
+
+@st.cache_resource
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """One long-lived event loop for the async graph, shared by all sessions"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="agent-event-loop", daemon=True).start()
+    return loop
 
 # Configuration
 st.set_page_config(
@@ -47,6 +51,13 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+try:
+    load_backend()
+    BACKEND_AVAILABLE = True
+except ImportError as e:
+    logger.warning(f"Backend not available: {e}")
+    BACKEND_AVAILABLE = False
+
 # Custom CSS
 st.markdown("""
 <style>
@@ -89,52 +100,70 @@ def initialize_session_state():
     if "backend_mode" not in st.session_state:
         st.session_state.backend_mode = BACKEND_AVAILABLE
 
-def chat_with_agent(message: str, session_id: str) -> str:
-    """Chat with the RAG agent"""
-    if not BACKEND_AVAILABLE:
-        return "⚠️ Backend not available. Please ensure all dependencies are installed."
-
+def stream_agent(message: str, session_id: str) -> Iterator[str]:
+    """Run the RAG agent and yield the answer text as tokens stream in"""
+    from langchain_core.messages import HumanMessage
+    from app.core.config import settings
+    from app.core.deadline import new_deadline
+
+    app_graph = load_backend()
+    config = {"configurable": {"thread_id": session_id, "deadline": new_deadline(settings.CHAT_DEADLINE_SECONDS)}}
+    inputs = {"messages": [HumanMessage(content=message)]}
+    events = queue.Queue()
+
+    async def produce():
+        try:
+            async for mode, payload in app_graph.astream(inputs, config=config, stream_mode=["messages", "values"]):
+                events.put((mode, payload))
+        except Exception as e:
+            events.put(("error", e))
+        finally:
+            events.put(("done", None))
+
+    logger.info(f"Processing chat request for session {session_id}")
+    future = asyncio.run_coroutine_threadsafe(produce(), get_event_loop())
+    text, stream_id, final_state = "", None, None
     try:
-        config = {"configurable": {"thread_id": session_id}}
-        inputs = {"messages": [HumanMessage(content=message)]}
-
-        logger.info(f"Processing chat request for session {session_id}")
-        result = app_graph.invoke(inputs, config=config)
-        last_message = result["messages"][-1]
-
-        logger.info(f"Successfully generated response for session {session_id}")
-        return last_message.content
-
-    except Exception as e:
-        logger.error(f"Error processing chat request: {e}", exc_info=True)
-        return f"❌ An error occurred: {str(e)}"
+        while True:
+            mode, payload = events.get()
+            if mode == "done":
+                break
+            if mode == "error":
+                raise payload
+            if mode == "values":
+                final_state = payload
+                continue
+            chunk, metadata = payload
+            if metadata.get("langgraph_node") != "generate" or not chunk.content:
+                continue
+            # A hedged duplicate request streams as well; follow the first one
+            stream_id = stream_id or chunk.id
+            if chunk.id == stream_id:
+                text += chunk.content
+                yield text
+    finally:
+        # Stops the graph if the script is rerun while the answer streams
+        future.cancel()
+
+    # The duplicate may have won, or the model may not have streamed at all
+    answer = final_state["messages"][-1].content if final_state else text
+    if answer != text:
+        yield answer
+    logger.info(f"Successfully generated response for session {session_id}")
 
 def process_uploaded_file(uploaded_file) -> Dict[str, Any]:
-    """Process uploaded document"""
+    """Chunk, embed and index an uploaded document"""
     if not BACKEND_AVAILABLE:
         return {"error": "Backend not available"}
 
-    try:
-        # Save uploaded file to a temporary file
-        suffix = Path(uploaded_file.name).suffix
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            tmp.write(uploaded_file.getvalue())
-            tmp_path = tmp.name
-
-        # Process the file (this would normally call your ingest function)
-        # For demo purposes, we'll simulate processing
-        result = {
-            "filename": uploaded_file.name,
-            "chunks": 42,  # Simulated
-            "status": "success"
-        }
-
-        # Cleanup
-        Path(tmp_path).unlink(missing_ok=True)
-
-        return result
+    from fastapi import UploadFile
+    from app.rag.ingest import ingest_document
 
+    try:
+        upload = UploadFile(file=io.BytesIO(uploaded_file.getvalue()), filename=uploaded_file.name)
+        return ingest_document(upload)
     except Exception as e:
+        logger.error(f"Error processing document: {e}", exc_info=True)
         return {"error": str(e)}
 
 def main():
@@ -224,12 +253,25 @@ def main():
             with st.chat_message("user"):
                 st.markdown(prompt)
 
-        # Get AI response
+        # Stream AI response
         with chat_container:
             with st.chat_message("assistant"):
-                with st.spinner("🤔 Thinking..."):
-                    ai_response = chat_with_agent(prompt, st.session_state.session_id)
-                    st.markdown(ai_response)
+                placeholder = st.empty()
+                if not BACKEND_AVAILABLE:
+                    ai_response = "⚠️ Backend not available. Please ensure all dependencies are installed."
+                else:
+                    ai_response = ""
+                    try:
+                        with st.spinner("🤔 Thinking..."):
+                            answer = stream_agent(prompt, st.session_state.session_id)
+                            ai_response = next(answer, "")
+                        placeholder.markdown(ai_response + "▌")
+                        for ai_response in answer:
+                            placeholder.markdown(ai_response + "▌")
+                    except Exception as e:
+                        logger.error(f"Error processing chat request: {e}", exc_info=True)
+                        ai_response = f"❌ An error occurred: {str(e)}"
+                placeholder.markdown(ai_response)
 
         # Save assistant message
         st.session_state.messages.append({"role": "assistant", "content": ai_response})
@@ -5,10 +5,17 @@ from langgraph.graph.message import add_messages
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableConfig
 import logging
-
-from app.core.llm import get_llm
+import requests
+
+from app.core.admission import call_upstream, search_governor
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, can_afford, get_deadline, remaining, stage_timeout
+from app.core.hedging import invoke_llm
+from app.core.metrics import CONTEXT_LENGTH, DEADLINE_DROPS, SUB_QUERIES, instrument_node, record_cache, record_llm_usage
+from app.core.shared_store import get_cache
+from app.rag.query_expansion import EXPANSION_MODES, parse_sub_queries, split_query
+from app.rag.retrieval import search_documents, search_many
 from app.rag.search import get_search_tool
-from app.rag.vector_store import get_vector_store
 
 logger = logging.getLogger(__name__)
 
@@ -16,41 +23,108 @@ logger = logging.getLogger(__name__)
 class AgentState(TypedDict):
     messages: Annotated[List[BaseMessage], add_messages]
     context: str
+    sub_queries: List[str]
 
 # Nodes
+@instrument_node("entry")
 def entry_point(state: AgentState):
     """Entry point that just passes through to routing."""
     return {}
 
-def retrieve(state: AgentState):
+@instrument_node("retrieve")
+def retrieve(state: AgentState, config: RunnableConfig = None):
     """
     Retrieve documents based on the last user message.
     """
     query = state["messages"][-1].content
     logger.info(f"📚 RETRIEVE: Retrieving documents for query: '{query}'")
-    vector_store = get_vector_store()
-    retriever = vector_store.as_retriever(search_kwargs={"k": 3})
-    docs = retriever.invoke(query)
+    timeout = stage_timeout(get_deadline(config), settings.RETRIEVAL_TIMEOUT, "retrieve")
+    sub_queries = state.get("sub_queries") or []
+    if sub_queries:
+        # The original question stays in the fusion so expansion cannot lose its hits
+        logger.info(f"📚 RETRIEVE: Searching {len(sub_queries)} sub-queries alongside the question")
+        docs = search_many([query] + sub_queries, timeout=timeout)
+    else:
+        docs = search_documents(query, timeout=timeout)
     context = "\n\n".join([doc.page_content for doc in docs])
+    CONTEXT_LENGTH.labels(source="retrieve").observe(len(context))
     logger.info(f"📚 RETRIEVE: Found {len(docs)} documents, context length: {len(context)}")
     return {"context": context}
 
-def web_search_node(state: AgentState):
+@instrument_node("expand_query")
+async def expand_query(state: AgentState, config: RunnableConfig = None):
+    """
+    Split a compound question into sub-queries that retrieve searches
+    alongside it: with one LLM call (QUERY_EXPANSION=llm, when the budget
+    allows) or local rules, which the LLM mode falls back to on failure.
+    """
+    query = state["messages"][-1].content
+    deadline = get_deadline(config)
+    mode, sub_queries = "heuristic", None
+    # Short questions are rarely compound; not worth an LLM call
+    if (settings.QUERY_EXPANSION == "llm" and len(query.split()) >= 6
+            and can_afford(deadline, settings.DEADLINE_MIN_OPTIONAL_BUDGET, "expand_query")):
+        expansion_prompt = ChatPromptTemplate.from_messages([
+            ("system", """Split the user's question into at most {max_queries} short, self-contained search queries, one per line, each covering one part of the question.
+If the question asks about a single thing, return it unchanged on one line.
+Return ONLY the queries, no numbering or explanations."""),
+            ("human", "{query}")
+        ])
+        try:
+            result = await invoke_llm(
+                "expand_query", expansion_prompt, {"query": query, "max_queries": settings.MAX_SUB_QUERIES},
+                timeout=settings.QUERY_EXPANSION_TIMEOUT, deadline=deadline, reserve=settings.DEADLINE_GENERATE_RESERVE
+            )
+            record_llm_usage("expand_query", result)
+            mode, sub_queries = "llm", parse_sub_queries(result.content, settings.MAX_SUB_QUERIES)
+        except Exception as e:
+            logger.warning(f"🧩 EXPAND: LLM expansion failed ({e!r}), using local rules")
+    if sub_queries is None:
+        sub_queries = split_query(query, settings.MAX_SUB_QUERIES)
+    sub_queries = [q for q in sub_queries if q.strip().lower() != query.strip().lower()]
+    SUB_QUERIES.labels(mode=mode).observe(1 + len(sub_queries))
+    logger.info(f"🧩 EXPAND: {len(sub_queries)} sub-queries ({mode}): {sub_queries}")
+    return {"sub_queries": sub_queries}
+
+@instrument_node("web_search")
+def web_search_node(state: AgentState, config: RunnableConfig = None):
     """
     Perform web search if needed.
     """
     query = state["messages"][-1].content
+    deadline = get_deadline(config)
     logger.info(f"🔍 WEB SEARCH: Performing web search for query: '{query}'")
-    search_tool = get_search_tool()
-    result = search_tool.run(query)
+    # Shared across worker processes when SHARED_STORE_PATH is set
+    cache_key = f"web_search:{query.strip().lower()}"
+    result = None
+    if settings.SEARCH_CACHE_TTL:
+        result = get_cache().get(cache_key)
+        record_cache("web_search", result is not None)
+    if result is None:
+        timeout = stage_timeout(deadline, settings.SEARCH_TIMEOUT, "web_search", reserve=settings.DEADLINE_GENERATE_RESERVE)
+        search_tool = get_search_tool(timeout=timeout)
+        try:
+            result = call_upstream(search_governor, search_tool.run, query, deadline=deadline)
+        except requests.Timeout as e:
+            if remaining(deadline) <= 0:
+                raise DeadlineExceeded(f"Request deadline ran out during web search ({timeout:.1f}s)") from e
+            # A slow search API should not fail the whole request: answer
+            # without web results in the time that is left
+            DEADLINE_DROPS.labels(stage="web_search").inc()
+            logger.warning(f"🔍 WEB SEARCH: Timed out after {timeout:.1f}s, answering without web results")
+            CONTEXT_LENGTH.labels(source="web_search").observe(0)
+            return {"context": ""}
+        if settings.SEARCH_CACHE_TTL:
+            get_cache().set(cache_key, result, settings.SEARCH_CACHE_TTL)
+    CONTEXT_LENGTH.labels(source="web_search").observe(len(result))
     logger.info(f"🔍 WEB SEARCH: Got result: {result[:200]}...")
     return {"context": result}
 
-def generate(state: AgentState):
+@instrument_node("generate")
+async def generate(state: AgentState, config: RunnableConfig = None):
     """
     Generate answer using LLM and context.
     """
-    llm = get_llm(timeout=60)
     messages = state["messages"]
     context = state.get("context", "")
     
@@ -85,11 +159,14 @@ Context:
         ("placeholder", "{messages}"),
     ])
     
-    chain = prompt | llm
-    response = chain.invoke({"messages": messages, "context": context})
+    response = await invoke_llm(
+        "generate", prompt, {"messages": messages, "context": context}, timeout=60, deadline=get_deadline(config)
+    )
+    record_llm_usage("generate", response)
     return {"messages": [response]}
 
-def route_question(state: AgentState) -> Literal["retrieve", "web_search"]:
+@instrument_node("route")
+async def route_question(state: AgentState, config: RunnableConfig = None) -> Literal["retrieve", "web_search"]:
     """
     Decide whether to use RAG retrieval or web search.
     Uses LLM to classify the query based on whether it requires current information
@@ -97,7 +174,11 @@ def route_question(state: AgentState) -> Literal["retrieve", "web_search"]:
     """
     query = state["messages"][-1].content
     logger.info(f"🎯 ROUTING: Analyzing query: '{query}'")
-    llm = get_llm(temperature=0, timeout=30)
+    deadline = get_deadline(config)
+    # Without time for a web search the only possible route is retrieval
+    if not can_afford(deadline, settings.DEADLINE_MIN_OPTIONAL_BUDGET, "route"):
+        logger.info("🎯 ROUTING: Low on time budget, skipping routing and web search")
+        return "retrieve"
 
     routing_prompt = ChatPromptTemplate.from_messages([
         ("system", """You are a routing agent. Analyze the user's query and decide whether it requires:
@@ -116,20 +197,28 @@ Return ONLY one word: 'retrieve' or 'web_search'"""),
         ("human", "{query}")
     ])
 
-    chain = routing_prompt | llm
-    result = chain.invoke({"query": query})
+    result = await invoke_llm(
+        "route", routing_prompt, {"query": query}, timeout=30, deadline=deadline, reserve=settings.DEADLINE_GENERATE_RESERVE
+    )
+    record_llm_usage("route", result)
     decision = result.content.strip().lower()
     logger.info(f"🎯 ROUTING: LLM decision: '{decision}' -> routing to: '{decision if 'web_search' in decision else 'retrieve'}'")
 
-    if "web_search" in decision:
+    if "web_search" in decision and can_afford(deadline, settings.DEADLINE_MIN_OPTIONAL_BUDGET, "web_search"):
         return "web_search"
     return "retrieve" 
 
 # Graph Construction
+if settings.QUERY_EXPANSION not in EXPANSION_MODES:
+    raise ValueError(f"Unknown QUERY_EXPANSION '{settings.QUERY_EXPANSION}', expected one of {EXPANSION_MODES}")
+
 workflow = StateGraph(AgentState)
 
 workflow.add_node("entry", entry_point)
 workflow.add_node("retrieve", retrieve)
+if settings.QUERY_EXPANSION != "off":
+    workflow.add_node("expand_query", expand_query)
+    workflow.add_edge("expand_query", "retrieve")
 workflow.add_node("web_search", web_search_node)
 workflow.add_node("generate", generate)
 
@@ -141,7 +230,7 @@ workflow.add_conditional_edges(
     "entry",
     route_question,
     {
-        "retrieve": "retrieve",
+        "retrieve": "expand_query" if settings.QUERY_EXPANSION != "off" else "retrieve",
         "web_search": "web_search"
     }
 )
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Request
-from pydantic import BaseModel
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Request, Header
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
 from typing import List, Optional
+import asyncio
+import hashlib
 import uuid
 import logging
-from app.rag.ingest import ingest_document
-from app.agent.graph import app_graph
-from langchain_core.messages import HumanMessage
+from app.rag.documents import list_documents, delete_document
 from app.core.limiter import limiter
+from app.core.config import settings
+from app.core.admission import UpstreamOverloaded, llm_governor
+from app.core.deadline import DeadlineExceeded, new_deadline, remaining
+from app.core.shared_store import get_session_history
+from app.core.metrics import CHAT_CANCELLED
+from app.core.startup import is_ready, warmup_error, warmup_failed
 
 logger = logging.getLogger(__name__)
 
@@ -15,27 +22,109 @@ router = APIRouter()
 class ChatRequest(BaseModel):
     message: str
     session_id: str = "default"
+    # Client-held secret for session history; turns are only recorded with one
+    history_token: Optional[str] = Field(None, min_length=16)
 
 class ChatResponse(BaseModel):
     response: str
     session_id: str
 
-@router.post("/chat", response_model=ChatResponse)
-@limiter.limit("20/minute")
+def _overloaded(error: UpstreamOverloaded) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="The service is busy. Please try again shortly.",
+        headers={"Retry-After": str(max(1, round(error.retry_after)))},
+    )
+
+def require_ready():
+    """
+    Rejects requests that need the model, index or agent until warm-up is done,
+    or with the cause if warm-up has failed.
+    """
+    if warmup_failed():
+        raise HTTPException(status_code=503, detail=f"The service failed to start: {warmup_error()}")
+    if not is_ready():
+        raise HTTPException(
+            status_code=503,
+            detail="The service is starting up. Please try again shortly.",
+            headers={"Retry-After": "5"},
+        )
+
+class ClientDisconnected(Exception):
+    pass
+
+def request_budget(request: Request) -> float:
+    """
+    Seconds this chat request may take: CHAT_DEADLINE_SECONDS, capped a
+    second below the client's own timeout (X-Request-Timeout) so the answer
+    arrives before the client gives up.
+    """
+    budget = settings.CHAT_DEADLINE_SECONDS
+    try:
+        budget = min(budget, float(request.headers["X-Request-Timeout"]) - 1)
+    except (KeyError, ValueError):
+        pass
+    return max(budget, 1.0)
+
+async def run_until_disconnect(request: Request, coro, deadline: float):
+    """
+    Runs the graph while watching the client and the deadline; cancels the
+    run when the client disconnects or the deadline passes.
+    """
+    task = asyncio.create_task(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=min(0.5, max(remaining(deadline), 0)))
+            if done:
+                return task.result()
+            if remaining(deadline) <= 0:
+                CHAT_CANCELLED.labels(reason="deadline").inc()
+                raise DeadlineExceeded("Request deadline exceeded")
+            if await request.is_disconnected():
+                CHAT_CANCELLED.labels(reason="disconnect").inc()
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+@router.post("/chat", response_model=ChatResponse, dependencies=[Depends(require_ready)])
+@limiter.limit(settings.CHAT_RATE_LIMIT)
 async def chat_endpoint(request: Request, chat_request: ChatRequest):
     """
     Chat with the agent.
     """
-    config = {"configurable": {"thread_id": chat_request.session_id}}
+    # Imported here so the server can start before langchain and langgraph load
+    from app.agent.graph import app_graph
+    from langchain_core.messages import HumanMessage
+
+    # The deadline travels in the graph config; nodes shrink their timeouts
+    # to what is left and skip optional stages when it runs low
+    deadline = new_deadline(request_budget(request))
+    config = {"configurable": {"thread_id": chat_request.session_id, "deadline": deadline}}
     inputs = {"messages": [HumanMessage(content=chat_request.message)]}
 
     try:
+        # Shed early, before spending on retrieval, when the LLM queue is already full
+        llm_governor.admit()
         logger.info(f"Processing chat request for session {chat_request.session_id}")
-        result = await app_graph.ainvoke(inputs, config=config)
+        result = await run_until_disconnect(request, app_graph.ainvoke(inputs, config=config), deadline)
         last_message = result["messages"][-1]
         logger.info(f"Successfully generated response for session {chat_request.session_id}")
+        if settings.SESSION_HISTORY_ENABLED and chat_request.history_token:
+            # Append-only: only this turn is written, never the whole conversation
+            get_session_history().append(_history_key(chat_request.session_id, chat_request.history_token), [
+                {"role": "user", "content": chat_request.message},
+                {"role": "assistant", "content": last_message.content},
+            ])
         return ChatResponse(response=last_message.content, session_id=chat_request.session_id)
 
+    except ClientDisconnected:
+        logger.info(f"Client disconnected, cancelled chat request for session {chat_request.session_id}")
+        # Nobody is listening; 499 is the conventional "client closed request" status
+        raise HTTPException(status_code=499, detail="Client closed request")
+    except UpstreamOverloaded as e:
+        logger.warning(f"Shedding chat request for session {chat_request.session_id}: {e}")
+        raise _overloaded(e)
     except TimeoutError as e:
         logger.error(f"Timeout error for session {chat_request.session_id}: {e}")
         raise HTTPException(status_code=504, detail="Request timed out. Please try again.")
@@ -43,20 +132,98 @@ async def chat_endpoint(request: Request, chat_request: ChatRequest):
         logger.error(f"Error processing chat request: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
-@router.post("/upload")
-async def upload_document(file: UploadFile = File(...)):
+@router.post("/upload", dependencies=[Depends(require_ready)])
+async def upload_document(file: UploadFile = File(...), collection: str = Form("default")):
     """
     Upload a document for RAG.
     """
+    from app.rag.ingest import ingest_document
+
     try:
-        result = ingest_document(file)
+        # Loading, embedding and saving the index block; run them off the
+        # event loop so in-flight chats keep being served meanwhile
+        result = await run_in_threadpool(ingest_document, file, collection)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+class HistoryMessage(BaseModel):
+    seq: int
+    role: str
+    content: str
+
+class SessionHistory(BaseModel):
+    session_id: str
+    messages: List[HistoryMessage]
+    total: int
+    has_more: bool
+
+def _history_key(session_id: str, token: str) -> str:
+    """
+    Storage key for a session's history. The session id alone (which ends
+    up in URLs and logs) is not enough to read it; the client's history
+    token is needed too, and only its hash is stored.
+    """
+    return f"{session_id}:{hashlib.sha256(token.encode()).hexdigest()}"
+
+def _require_history():
+    if not settings.SESSION_HISTORY_ENABLED:
+        raise HTTPException(status_code=404, detail="Session history is disabled")
+
 @router.get("/sessions")
 async def list_sessions():
     """
     List active sessions (Placeholder).
     """
     return {"sessions": ["default", "session-1"]}
+
+@router.get("/sessions/{session_id}/messages", response_model=SessionHistory, dependencies=[Depends(_require_history)])
+async def get_session_messages(
+    session_id: str,
+    before: Optional[int] = None,
+    limit: int = 20,
+    x_history_token: str = Header(..., min_length=16),
+):
+    """
+    One page of a session's chat history, oldest first. Without `before`
+    the newest messages are returned; pass the first message's seq as
+    `before` to load the page preceding it. The X-History-Token header must
+    carry the token the turns were recorded with; any other token sees an
+    empty history.
+    """
+    limit = max(1, min(limit, settings.SESSION_HISTORY_MAX_PAGE))
+    messages, total = get_session_history().page(_history_key(session_id, x_history_token), before, limit)
+    has_more = bool(messages) and messages[0]["seq"] > 0
+    return SessionHistory(session_id=session_id, messages=messages, total=total, has_more=has_more)
+
+@router.delete("/sessions/{session_id}/messages", dependencies=[Depends(_require_history)])
+async def clear_session_messages(session_id: str, x_history_token: str = Header(..., min_length=16)):
+    """
+    Delete a session's chat history (X-History-Token as for reading it).
+    """
+    deleted = get_session_history().clear(_history_key(session_id, x_history_token))
+    return {"session_id": session_id, "deleted": deleted}
+
+@router.get("/documents", dependencies=[Depends(require_ready)])
+async def get_documents():
+    """
+    List indexed documents with chunk counts and sizes.
+    """
+    from app.rag.vector_store import index_manager
+
+    with index_manager.reader() as vector_store:
+        return {"documents": list_documents(vector_store)}
+
+@router.delete("/documents/{doc_id}", dependencies=[Depends(require_ready)])
+async def remove_document(doc_id: str):
+    """
+    Delete a document. Its chunks are masked immediately and
+    physically removed by background compaction.
+    """
+    from app.rag.vector_store import index_manager
+
+    try:
+        with index_manager.reader() as vector_store:
+            return delete_document(vector_store, doc_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Document not found: {doc_id}")
@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional
+from app.core.config import settings
+from app.core.metrics import UPSTREAM_IN_FLIGHT, UPSTREAM_QUEUE_DEPTH, UPSTREAM_QUEUE_WAIT, UPSTREAM_RETRIES, UPSTREAM_SHED
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class UpstreamOverloaded(Exception):
+    """
+    Raised when a call is shed instead of queued: the wait queue is full, the
+    queue wait ran past its deadline, or the upstream kept answering 429/5xx.
+    The API turns it into a 503 with Retry-After.
+    """
+
+    def __init__(self, upstream: str, reason: str, retry_after: float = 1.0):
+        super().__init__(f"{upstream} is overloaded ({reason})")
+        self.upstream = upstream
+        self.reason = reason
+        self.retry_after = retry_after
+
+class _Waiter:
+    """
+    A queued caller, woken either through a threading.Event (sync nodes run
+    in worker threads) or an asyncio future on the caller's loop.
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+        self.granted = False
+
+    def grant(self):
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+class Governor:
+    """
+    Bounded concurrency for one upstream (LLM or web search).
+
+    At most `limit` calls run at once; up to `max_queue` more wait in FIFO
+    order for at most `max_wait` seconds (or until the caller's deadline).
+    Anything beyond that is rejected immediately with UpstreamOverloaded.
+    Usable from both threads and coroutines.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._active = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def admit(self):
+        """
+        Raises UpstreamOverloaded when a new call would be shed right away,
+        so a request can be rejected before any work is spent on it.
+        """
+        if self._active >= self.limit and len(self._waiters) >= self.max_queue:
+            UPSTREAM_SHED.labels(upstream=self.name, reason="admission").inc()
+            raise UpstreamOverloaded(self.name, "queue full", retry_after=self.max_wait)
+
+    def _enter(self, waiter: _Waiter) -> bool:
+        """
+        Takes a slot (True) or queues the waiter (False); sheds when full.
+        """
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                UPSTREAM_IN_FLIGHT.labels(upstream=self.name).set(self._active)
+                return True
+            if len(self._waiters) >= self.max_queue:
+                UPSTREAM_SHED.labels(upstream=self.name, reason="queue_full").inc()
+                raise UpstreamOverloaded(self.name, "queue full", retry_after=self.max_wait)
+            self._waiters.append(waiter)
+            UPSTREAM_QUEUE_DEPTH.labels(upstream=self.name).set(len(self._waiters))
+            return False
+
+    def _release(self):
+        with self._lock:
+            # Hand the slot straight to the next waiter so it cannot be
+            # overtaken by a newly arriving caller
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                UPSTREAM_QUEUE_DEPTH.labels(upstream=self.name).set(len(self._waiters))
+                waiter.grant()
+                return
+            self._active -= 1
+            UPSTREAM_IN_FLIGHT.labels(upstream=self.name).set(self._active)
+
+    def _abandon(self, waiter: _Waiter):
+        """
+        Removes a waiter whose wait timed out or was cancelled.
+        """
+        with self._lock:
+            if not waiter.granted:
+                self._waiters.remove(waiter)
+                UPSTREAM_QUEUE_DEPTH.labels(upstream=self.name).set(len(self._waiters))
+                return
+        # The slot was handed over just as the wait ended: pass it on
+        self._release()
+
+    def _wait_budget(self, deadline: Optional[float]) -> float:
+        budget = self.max_wait
+        if deadline is not None:
+            budget = min(budget, deadline - time.monotonic())
+        return max(budget, 0.0)
+
+    def _timed_out(self, start: float):
+        UPSTREAM_QUEUE_WAIT.labels(upstream=self.name).observe(time.monotonic() - start)
+        UPSTREAM_SHED.labels(upstream=self.name, reason="wait_timeout").inc()
+        raise UpstreamOverloaded(self.name, "queue wait timed out", retry_after=self.max_wait)
+
+    @contextmanager
+    def slot(self, deadline: Optional[float] = None):
+        """
+        Holds a slot for a blocking call. `deadline` is a time.monotonic() value.
+        """
+        start = time.monotonic()
+        waiter = _Waiter()
+        if not self._enter(waiter):
+            if not waiter.event.wait(self._wait_budget(deadline)):
+                self._abandon(waiter)
+                self._timed_out(start)
+        UPSTREAM_QUEUE_WAIT.labels(upstream=self.name).observe(time.monotonic() - start)
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def aslot(self, deadline: Optional[float] = None):
+        """
+        Async version of slot().
+        """
+        start = time.monotonic()
+        waiter = _Waiter(asyncio.get_running_loop())
+        if not self._enter(waiter):
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), self._wait_budget(deadline))
+            except asyncio.TimeoutError:
+                self._abandon(waiter)
+                self._timed_out(start)
+            except asyncio.CancelledError:
+                self._abandon(waiter)
+                raise
+        UPSTREAM_QUEUE_WAIT.labels(upstream=self.name).observe(time.monotonic() - start)
+        try:
+            yield
+        finally:
+            self._release()
+
+def status_code(exc: Exception) -> Optional[int]:
+    """
+    HTTP status of an upstream error (openai or requests exceptions).
+    """
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        response = getattr(exc, "response", None)
+        code = getattr(response, "status_code", None)
+    return code if isinstance(code, int) else None
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Exponential backoff with full jitter.
+    """
+    ceiling = min(settings.UPSTREAM_RETRY_MAX_DELAY, settings.UPSTREAM_RETRY_BASE_DELAY * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+def _retry_or_raise(governor: Governor, exc: Exception, attempt: int, deadline: Optional[float]) -> float:
+    """
+    Returns the delay before the next attempt, or raises when the error
+    is not retryable or no attempt (or time) is left.
+    """
+    code = status_code(exc)
+    if code not in RETRYABLE_STATUS:
+        raise exc
+    delay = backoff_delay(attempt)
+    out_of_time = deadline is not None and time.monotonic() + delay >= deadline
+    if attempt >= settings.UPSTREAM_MAX_RETRIES or out_of_time:
+        UPSTREAM_SHED.labels(upstream=governor.name, reason=f"upstream_{code}").inc()
+        raise UpstreamOverloaded(governor.name, f"upstream returned {code}", retry_after=max(delay, 1.0)) from exc
+    UPSTREAM_RETRIES.labels(upstream=governor.name, status=str(code)).inc()
+    logger.warning(f"{governor.name} returned {code}, retrying in {delay:.2f}s (attempt {attempt + 1})")
+    return delay
+
+def call_upstream(governor: Governor, func, *args, deadline: Optional[float] = None, **kwargs):
+    """
+    Runs a blocking upstream call inside a governor slot, retrying 429/5xx
+    responses with jittered backoff. The slot is released while backing off.
+    """
+    attempt = 0
+    while True:
+        try:
+            with governor.slot(deadline):
+                return func(*args, **kwargs)
+        except UpstreamOverloaded:
+            raise
+        except Exception as e:
+            time.sleep(_retry_or_raise(governor, e, attempt, deadline))
+            attempt += 1
+
+async def acall_upstream(governor: Governor, func, *args, deadline: Optional[float] = None, **kwargs):
+    """
+    Async version of call_upstream() for coroutine functions.
+    """
+    attempt = 0
+    while True:
+        try:
+            async with governor.aslot(deadline):
+                return await func(*args, **kwargs)
+        except UpstreamOverloaded:
+            raise
+        except Exception as e:
+            await asyncio.sleep(_retry_or_raise(governor, e, attempt, deadline))
+            attempt += 1
+
+# Limits are per worker process
+llm_governor = Governor("llm", settings.LLM_MAX_CONCURRENCY, settings.LLM_MAX_QUEUE, settings.LLM_MAX_QUEUE_WAIT)
+search_governor = Governor("search", settings.SEARCH_MAX_CONCURRENCY, settings.SEARCH_MAX_QUEUE, settings.SEARCH_MAX_QUEUE_WAIT)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 import os
 from pathlib import Path
 
@@ -11,14 +11,129 @@ class Settings(BaseSettings):
     # LLM Settings
     OPENROUTER_API_KEY: str
     OPENROUTER_MODEL: str = "openai/gpt-3.5-turbo" # Default or whatever is preferred
+    OPENROUTER_BASE_URL: str = "https://openrouter.ai/api/v1"
+    # Tried in order when OPENROUTER_MODEL times out or fails, e.g. ["openai/gpt-4o-mini"]
+    LLM_FALLBACK_MODELS: List[str] = []
+    # Seconds each model gets before falling back; unset splits the call's
+    # timeout evenly across the models still to try
+    LLM_ATTEMPT_TIMEOUT: Optional[float] = None
+    # Send a duplicate request when the first is slower than the recent
+    # latency quantile (LLM_HEDGE_DELAY until enough calls were seen)
+    LLM_HEDGING: bool = False
+    LLM_HEDGE_QUANTILE: float = 0.95
+    LLM_HEDGE_DELAY: float = 5.0
+    LLM_HEDGE_MIN_DELAY: float = 0.5
     
     # Search Settings
     SERPER_API_KEY: Optional[str] = None
+    SERPER_BASE_URL: str = "https://google.serper.dev"
+    
+    # Rate Limiting
+    CHAT_RATE_LIMIT: str = "20/minute"
+    
+    # Request Deadlines
+    # Total budget of one /api/chat request (capped by the client's X-Request-Timeout)
+    CHAT_DEADLINE_SECONDS: float = 55.0
+    # Seconds kept for generation while routing and searching
+    DEADLINE_GENERATE_RESERVE: float = 10.0
+    # Below this much remaining budget the routing call and web search are skipped
+    DEADLINE_MIN_OPTIONAL_BUDGET: float = 20.0
+    SEARCH_TIMEOUT: float = 10.0
+    RETRIEVAL_TIMEOUT: float = 5.0
+    
+    # Admission Control (per worker process)
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_MAX_QUEUE: int = 32
+    LLM_MAX_QUEUE_WAIT: float = 10.0  # seconds before a queued call is shed
+    SEARCH_MAX_CONCURRENCY: int = 4
+    SEARCH_MAX_QUEUE: int = 16
+    SEARCH_MAX_QUEUE_WAIT: float = 5.0
+    # Retries on 429/5xx with exponential backoff and full jitter
+    UPSTREAM_MAX_RETRIES: int = 2
+    UPSTREAM_RETRY_BASE_DELAY: float = 0.5
+    UPSTREAM_RETRY_MAX_DELAY: float = 8.0
+    
+    # Multi-worker Settings
+    # SQLite file shared by all workers on a host for rate limits and caches
+    # (unset keeps both in process memory, which is only correct with one worker)
+    SHARED_STORE_PATH: Optional[str] = None
+    SEARCH_CACHE_TTL: int = 300  # seconds, 0 disables the web search cache
+    # How often workers check whether another worker saved a newer index
+    INDEX_REFRESH_SECONDS: float = 2.0
+    # Memory-map the saved index read-only so workers share its pages
+    VECTOR_INDEX_MMAP: bool = False
+    
+    # Startup Settings
+    # Accept connections right away and load the model and index in the
+    # background (/ready reports when done); False loads them before serving
+    BACKGROUND_WARMUP: bool = True
+    # A failed warm-up is retried with exponential backoff (doubling from
+    # WARMUP_RETRY_BACKOFF seconds, at most 60s); after the last attempt
+    # /health fails so the orchestrator restarts the process
+    WARMUP_MAX_ATTEMPTS: int = 5
+    WARMUP_RETRY_BACKOFF: float = 2.0
+    
+    # Session History Settings
+    # Keep each session's chat turns (in SHARED_STORE_PATH when set) so
+    # clients can page through history instead of storing it themselves.
+    # Off by default; reading a session back requires its history token
+    SESSION_HISTORY_ENABLED: bool = False
+    SESSION_HISTORY_MAX_PAGE: int = 100
+    
+    # Observability Settings
+    # Tag each request with a trace id (X-Request-ID) and include it in logs
+    TRACE_IDS_ENABLED: bool = True
     
     # Vector DB Settings
     CHROMA_PERSIST_DIRECTORY: str = "./chroma_db"
     CHROMA_SERVER_NOFILE: Optional[int] = None
     
+    # Embedding Settings
+    EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    EMBEDDING_BACKEND: str = "torch"  # torch, int8 or onnx
+    EMBEDDING_BATCH_WINDOW_MS: float = 5.0  # 0 disables query micro-batching
+    EMBEDDING_MAX_BATCH: int = 64
+    EMBEDDING_BATCH_SIZE: int = 64
+    EMBEDDING_THREADS: Optional[int] = None
+    
+    # Chunking Settings
+    CHUNK_STRATEGY: str = "auto"  # auto, recursive, markdown or pdf_layout
+    CHUNK_SIZE: int = 256
+    CHUNK_OVERLAP: int = 20
+    CHUNK_UNIT: str = "tokens"  # tokens (tiktoken) or chars
+    # Per-collection overrides, e.g. {"papers": {"strategy": "pdf_layout", "chunk_size": 400}}
+    CHUNKING_COLLECTIONS: Dict[str, dict] = {}
+    
+    # Parent-document retrieval: when set, documents are split into parent
+    # sections of this size, only their small child chunks (CHUNK_SIZE) are
+    # embedded, and hits are expanded back to the parents at query time.
+    # Per collection via CHUNKING_COLLECTIONS, e.g. {"parent_chunk_size": 1024}
+    PARENT_CHUNK_SIZE: Optional[int] = None
+    
+    # Retrieval Settings
+    RETRIEVAL_K: int = 3
+    # Child hits considered when expanding to parents, and the token budget
+    # for the parents returned (at most RETRIEVAL_K of them)
+    PARENT_FETCH_K: int = 20
+    PARENT_CONTEXT_TOKENS: int = 3000
+    # Split compound questions into sub-queries searched in one batched
+    # FAISS call and merged by reciprocal rank fusion: off, heuristic
+    # (local, no extra latency to speak of) or llm (one extra LLM call)
+    QUERY_EXPANSION: str = "off"
+    MAX_SUB_QUERIES: int = 4
+    RRF_K: int = 60
+    QUERY_EXPANSION_TIMEOUT: float = 10.0
+    
+    # Vector Storage Settings
+    VECTOR_STORAGE: str = "float32"  # float32, float16 or int8
+    # Rescore k * factor quantized candidates at full precision (0 disables).
+    # Needs a float32 copy of every vector (full_vectors.npy, memory-mapped)
+    VECTOR_RESCORE_FACTOR: int = 0
+    
+    # Document Deletion Settings
+    # Fraction of tombstoned chunks that triggers a background index compaction
+    COMPACTION_TOMBSTONE_RATIO: float = 0.2
+    
     class Config:
         # Load .env from project root (two levels up from this file)
         env_file = str(Path(__file__).parent.parent.parent.parent / ".env")
@@ -0,0 +1,52 @@
+import time
+from typing import TYPE_CHECKING, Optional
+from app.core.metrics import DEADLINE_DROPS
+
+if TYPE_CHECKING:
+    # langchain_core is slow to import and not needed to serve /health
+    from langchain_core.runnables import RunnableConfig
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised when a request's time budget is used up before a stage starts.
+    """
+
+def new_deadline(budget_seconds: float) -> float:
+    """
+    Returns an absolute deadline (time.monotonic() based).
+    """
+    return time.monotonic() + budget_seconds
+
+def get_deadline(config: Optional["RunnableConfig"]) -> Optional[float]:
+    """
+    The request deadline carried in the LangGraph config, if any.
+    """
+    if not config:
+        return None
+    return config.get("configurable", {}).get("deadline")
+
+def remaining(deadline: Optional[float]) -> float:
+    if deadline is None:
+        return float("inf")
+    return deadline - time.monotonic()
+
+def stage_timeout(deadline: Optional[float], cap: float, stage: str, reserve: float = 0.0) -> float:
+    """
+    Timeout for one stage: its usual cap, shrunk to what is left of the
+    request budget after keeping `reserve` seconds for later stages.
+    Raises DeadlineExceeded when nothing is left.
+    """
+    budget = min(cap, remaining(deadline) - reserve)
+    if budget <= 0:
+        raise DeadlineExceeded(f"No time left for {stage}")
+    return budget
+
+def can_afford(deadline: Optional[float], seconds: float, stage: str) -> bool:
+    """
+    Whether an optional stage still fits in the budget; counts the stages
+    that get dropped.
+    """
+    if remaining(deadline) >= seconds:
+        return True
+    DEADLINE_DROPS.labels(stage=stage).inc()
+    return False
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Optional
+from app.core.admission import UpstreamOverloaded, acall_upstream, llm_governor
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, stage_timeout
+from app.core.llm import get_llm
+from app.core.metrics import LLM_FALLBACKS, LLM_HEDGES, LLM_MODEL_WINS
+
+logger = logging.getLogger(__name__)
+
+class LatencyTracker:
+    """
+    Rolling window of successful LLM call latencies per node, used to pick
+    the hedge delay.
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def observe(self, node: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(node, deque(maxlen=self.window)).append(seconds)
+
+    def quantile(self, node: str, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(node, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+latency_tracker = LatencyTracker()
+
+def hedge_delay(node: str) -> float:
+    """
+    Seconds to wait for the first request before sending a duplicate:
+    the node's recent latency quantile, or LLM_HEDGE_DELAY until enough
+    calls have been seen.
+    """
+    observed = latency_tracker.quantile(node, settings.LLM_HEDGE_QUANTILE)
+    delay = observed if observed is not None else settings.LLM_HEDGE_DELAY
+    return max(delay, settings.LLM_HEDGE_MIN_DELAY)
+
+async def _cancel(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+async def _hedged_call(node: str, call):
+    """
+    Runs call(); if it has not finished after the hedge delay, runs a second
+    copy and returns whichever succeeds first, cancelling the other.
+    """
+    primary = asyncio.create_task(call())
+    tasks = [primary]
+    try:
+        # A duplicate only adds load when calls are already queueing
+        if not settings.LLM_HEDGING or llm_governor.queue_depth:
+            return await primary
+
+        done, _ = await asyncio.wait(tasks, timeout=hedge_delay(node))
+        if done:
+            return primary.result()
+
+        hedge = asyncio.create_task(call())
+        tasks.append(hedge)
+        pending, error = set(tasks), None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    LLM_HEDGES.labels(node=node, outcome="won" if task is hedge else "wasted").inc()
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        await _cancel([task for task in tasks if not task.done()])
+
+async def invoke_llm(node: str, prompt, inputs: dict, timeout: float, temperature: float = 0,
+                     deadline: Optional[float] = None, reserve: float = 0.0):
+    """
+    Invokes `prompt | llm` for a graph node with admission control, optional
+    hedging and fallback through LLM_FALLBACK_MODELS on timeout or error.
+
+    `timeout` bounds the whole call, fallbacks included, and is shrunk to
+    what is left before `deadline` after keeping `reserve` seconds for later
+    stages. Each model gets its own share of it (LLM_ATTEMPT_TIMEOUT, or an
+    even split across the models still to try; the last gets all that is
+    left), so a slow primary leaves time for the fallback.
+    """
+    models = [settings.OPENROUTER_MODEL] + [m for m in settings.LLM_FALLBACK_MODELS if m != settings.OPENROUTER_MODEL]
+    stage_end = time.monotonic() + timeout
+    failed = None
+    for position, model in enumerate(models):
+        try:
+            budget = stage_timeout(deadline, stage_end - time.monotonic(), node, reserve)
+        except DeadlineExceeded as e:
+            if failed is None:
+                raise
+            raise e from failed[2]
+        if failed is not None:
+            # Counted only now that the next model is actually called
+            failed_model, reason, error = failed
+            LLM_FALLBACKS.labels(node=node, model=model, reason=reason).inc()
+            logger.warning(f"{node}: {failed_model} failed ({reason}: {error!r}), falling back to {model}")
+
+        models_left = len(models) - position
+        if models_left == 1:
+            attempt_timeout = budget
+        else:
+            attempt_timeout = min(budget, settings.LLM_ATTEMPT_TIMEOUT or budget / models_left)
+        # Upstream retries stay within this attempt too
+        attempt_deadline = time.monotonic() + attempt_timeout
+        chain = prompt | get_llm(model=model, temperature=temperature, timeout=attempt_timeout)
+
+        async def call():
+            start = time.perf_counter()
+            result = await acall_upstream(llm_governor, chain.ainvoke, inputs, deadline=attempt_deadline)
+            latency_tracker.observe(node, time.perf_counter() - start)
+            return result
+
+        try:
+            result = await asyncio.wait_for(_hedged_call(node, call), attempt_timeout)
+            LLM_MODEL_WINS.labels(node=node, model=model).inc()
+            return result
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Shed locally (queue full or wait timed out): another model
+            # would wait in the same queue
+            if isinstance(e, UpstreamOverloaded) and not e.reason.startswith("upstream"):
+                raise
+            if position == len(models) - 1:
+                raise
+            failed = (model, "timeout" if isinstance(e, asyncio.TimeoutError) else "error", e)
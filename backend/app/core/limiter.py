@@ -1,5 +1,9 @@
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
+# Registers the sqlite:// storage scheme with `limits`
+from app.core.shared_store import rate_limit_storage_uri
 
-limiter = Limiter(key_func=get_remote_address)
+# Counters live in the shared SQLite store when SHARED_STORE_PATH is set, so
+# limits hold across all worker processes instead of per worker
+limiter = Limiter(key_func=get_remote_address, storage_uri=rate_limit_storage_uri())
@@ -1,7 +1,7 @@
 from langchain_openai import ChatOpenAI
 from app.core.config import settings
 
-def get_llm(model: str = settings.OPENROUTER_MODEL, temperature: float = 0, timeout: int = 60):
+def get_llm(model: str = settings.OPENROUTER_MODEL, temperature: float = 0, timeout: float = 60):
     """
     Returns a ChatOpenAI instance configured for OpenRouter.
     
@@ -13,8 +13,10 @@ def get_llm(model: str = settings.OPENROUTER_MODEL, temperature: float = 0, time
     return ChatOpenAI(
         model=model,
         openai_api_key=settings.OPENROUTER_API_KEY,
-        openai_api_base="https://openrouter.ai/api/v1",
+        openai_api_base=settings.OPENROUTER_BASE_URL,
         temperature=temperature,
         timeout=timeout,
         request_timeout=timeout,
+        # Retries are done by app.core.admission, outside the concurrency slot
+        max_retries=0,
     )
@@ -0,0 +1,173 @@
+import asyncio
+import functools
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from prometheus_client import Counter, Gauge, Histogram
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+CONTEXT_BUCKETS = (0, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+NODE_LATENCY = Histogram(
+    "rag_node_latency_seconds", "Latency of each agent graph node", ["node"], buckets=LATENCY_BUCKETS
+)
+NODE_ERRORS = Counter(
+    "rag_node_errors_total", "Exceptions raised by agent graph nodes", ["node"]
+)
+STAGE_LATENCY = Histogram(
+    "rag_stage_latency_seconds", "Latency of pipeline stages inside nodes and ingestion",
+    ["pipeline", "stage"], buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Histogram(
+    "rag_llm_tokens", "Prompt and completion tokens per LLM call", ["node", "kind"], buckets=TOKEN_BUCKETS
+)
+CONTEXT_LENGTH = Histogram(
+    "rag_context_chars", "Characters of context handed to generation", ["source"], buckets=CONTEXT_BUCKETS
+)
+CACHE_REQUESTS = Counter(
+    "rag_cache_requests_total", "Cache lookups by cache and result (hit or miss)", ["cache", "result"]
+)
+SUB_QUERIES = Histogram(
+    "rag_sub_queries", "Queries searched per retrieval after query expansion", ["mode"], buckets=(1, 2, 3, 4, 6, 8)
+)
+# Admission control for upstream LLM and search calls (livesum sums live gunicorn workers)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "rag_upstream_in_flight", "Upstream calls currently running", ["upstream"], multiprocess_mode="livesum"
+)
+UPSTREAM_QUEUE_DEPTH = Gauge(
+    "rag_upstream_queue_depth", "Upstream calls waiting for a slot", ["upstream"], multiprocess_mode="livesum"
+)
+UPSTREAM_QUEUE_WAIT = Histogram(
+    "rag_upstream_queue_wait_seconds", "Time spent waiting for an upstream slot", ["upstream"], buckets=LATENCY_BUCKETS
+)
+UPSTREAM_SHED = Counter(
+    "rag_upstream_shed_total", "Upstream calls rejected instead of queued or retried", ["upstream", "reason"]
+)
+UPSTREAM_RETRIES = Counter(
+    "rag_upstream_retries_total", "Upstream calls retried after a 429/5xx", ["upstream", "status"]
+)
+# Cold start: seconds spent in each warm-up phase
+STARTUP_SECONDS = Gauge(
+    "rag_startup_seconds", "Seconds spent in each warm-up phase", ["phase"], multiprocess_mode="max"
+)
+# Request deadlines
+DEADLINE_DROPS = Counter(
+    "rag_deadline_dropped_stages_total", "Optional stages skipped (too little of the request budget left) or abandoned after timing out", ["stage"]
+)
+CHAT_CANCELLED = Counter(
+    "rag_chat_cancelled_total", "Chat requests whose graph run was cancelled", ["reason"]
+)
+# Hedged requests and model fallback
+LLM_HEDGES = Counter(
+    "rag_llm_hedges_total", "Hedged duplicate LLM requests by outcome (won, or wasted when the first request won)",
+    ["node", "outcome"]
+)
+LLM_MODEL_WINS = Counter(
+    "rag_llm_model_wins_total", "LLM calls answered, by the model that answered", ["node", "model"]
+)
+LLM_FALLBACKS = Counter(
+    "rag_llm_fallbacks_total", "Fallbacks to the next model after a timeout or error", ["node", "model", "reason"]
+)
+
+# Per-request trace id, propagated into log records by TraceIdFilter
+trace_id_var: ContextVar[str] = ContextVar("trace_id", default="-")
+
+def new_trace_id(incoming: Optional[str] = None) -> str:
+    trace_id = incoming or uuid.uuid4().hex[:16]
+    trace_id_var.set(trace_id)
+    return trace_id
+
+class TraceIdFilter(logging.Filter):
+    """
+    Adds the current request's trace id to every log record as %(trace_id)s.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = trace_id_var.get()
+        return True
+
+class TraceIdMiddleware:
+    """
+    Tags each HTTP request with a trace id (incoming X-Request-ID or a new
+    one) and echoes it in the response headers.
+    Plain ASGI rather than BaseHTTPMiddleware, which hides client
+    disconnects from request.is_disconnected().
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        incoming = dict(scope["headers"]).get(b"x-request-id")
+        trace_id = new_trace_id(incoming.decode("latin-1") if incoming else None)
+
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                headers = [*message.get("headers", []), (b"x-request-id", trace_id.encode("latin-1"))]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_trace_id)
+
+def install_trace_logging(fmt: str = "%(levelname)s [%(trace_id)s] %(name)s: %(message)s"):
+    for handler in logging.getLogger().handlers:
+        handler.addFilter(TraceIdFilter())
+        handler.setFormatter(logging.Formatter(fmt))
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+def record_llm_usage(node: str, message):
+    """
+    Records prompt/completion token counts reported on an AIMessage.
+    """
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return
+    LLM_TOKENS.labels(node=node, kind="prompt").observe(usage.get("input_tokens", 0))
+    LLM_TOKENS.labels(node=node, kind="completion").observe(usage.get("output_tokens", 0))
+
+@contextmanager
+def stage_timer(pipeline: str, stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(pipeline=pipeline, stage=stage).observe(time.perf_counter() - start)
+
+def instrument_node(name: str):
+    """
+    Decorator recording latency and errors of a graph node (sync or async).
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    NODE_ERRORS.labels(node=name).inc()
+                    raise
+                finally:
+                    NODE_LATENCY.labels(node=name).observe(time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                NODE_ERRORS.labels(node=name).inc()
+                raise
+            finally:
+                NODE_LATENCY.labels(node=name).observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
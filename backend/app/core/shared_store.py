@@ -0,0 +1,291 @@
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+from limits.storage import Storage
+from app.core.config import settings
+
+@contextmanager
+def file_lock(path: Path):
+    """
+    Cross-process exclusive lock on a lock file (POSIX flock).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+class _SQLiteConnections:
+    """
+    One SQLite connection per thread and process, in WAL mode so readers in
+    other workers are not blocked by a writer.
+    """
+
+    def __init__(self, path: str, schema: str):
+        self.path = path
+        self.schema = schema
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.schema)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+class SQLiteRateLimitStorage(Storage):
+    """
+    Fixed-window rate limit storage for `limits`/slowapi shared by every worker
+    on a host. Registered for URIs like sqlite:////path/to/shared.db
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL,
+            expiry REAL NOT NULL
+        );
+    """
+
+    def __init__(self, uri: Optional[str] = None, wrap_exceptions: bool = False, **options):
+        path = uri.split("://", 1)[1] if uri else ":memory:"
+        self._connections = _SQLiteConnections(path, self.SCHEMA)
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def incr(self, key: str, expiry: float, amount: int = 1) -> int:
+        now = time.time()
+        row = self._connections.get().execute(
+            """
+            INSERT INTO rate_limits (key, value, expiry) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                value = CASE WHEN rate_limits.expiry <= ? THEN excluded.value ELSE rate_limits.value + excluded.value END,
+                expiry = CASE WHEN rate_limits.expiry <= ? THEN excluded.expiry ELSE rate_limits.expiry END
+            RETURNING value
+            """,
+            (key, amount, now + expiry, now, now),
+        ).fetchone()
+        return row[0]
+
+    def get(self, key: str) -> int:
+        row = self._connections.get().execute(
+            "SELECT value FROM rate_limits WHERE key = ? AND expiry > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        row = self._connections.get().execute(
+            "SELECT expiry FROM rate_limits WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self) -> bool:
+        try:
+            self._connections.get().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> Optional[int]:
+        return self._connections.get().execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key: str) -> None:
+        self._connections.get().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+class SQLiteCache:
+    """
+    JSON key/value cache with per-entry TTL, shared by every worker on a host.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cache (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            expiry REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path: str):
+        self._connections = _SQLiteConnections(path, self.SCHEMA)
+
+    def get(self, key: str) -> Any:
+        row = self._connections.get().execute(
+            "SELECT value FROM cache WHERE key = ? AND expiry > ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: float):
+        conn = self._connections.get()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expiry) VALUES (?, ?, ?)",
+            (key, json.dumps(value), now + ttl),
+        )
+        # Opportunistically drop expired entries so the table stays small
+        if hash(key) % 100 == 0:
+            conn.execute("DELETE FROM cache WHERE expiry <= ?", (now,))
+
+class MemoryCache:
+    """
+    In-process fallback with the same interface as SQLiteCache.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.time():
+                return None
+            return entry[0]
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (value, time.time() + ttl)
+
+class SQLiteSessionHistory:
+    """
+    Append-only chat history per session, shared by every worker on a host.
+    Messages are numbered per session (seq) so clients can page backwards.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS session_messages (
+            session_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created REAL NOT NULL,
+            PRIMARY KEY (session_id, seq)
+        );
+    """
+
+    def __init__(self, path: str):
+        self._connections = _SQLiteConnections(path, self.SCHEMA)
+
+    def append(self, session_id: str, messages: List[dict]):
+        conn = self._connections.get()
+        now = time.time()
+        # BEGIN IMMEDIATE so two workers cannot hand out the same seq
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            start = conn.execute(
+                "SELECT COALESCE(MAX(seq) + 1, 0) FROM session_messages WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+            conn.executemany(
+                "INSERT INTO session_messages (session_id, seq, role, content, created) VALUES (?, ?, ?, ?, ?)",
+                [(session_id, start + i, m["role"], m["content"], now) for i, m in enumerate(messages)],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def page(self, session_id: str, before: Optional[int], limit: int) -> Tuple[List[dict], int]:
+        """
+        Returns up to `limit` messages older than seq `before` (the newest
+        when None), oldest first, and the session's total message count.
+        """
+        conn = self._connections.get()
+        rows = conn.execute(
+            """
+            SELECT seq, role, content FROM session_messages
+            WHERE session_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?
+            """,
+            (session_id, before if before is not None else 2 ** 62, limit),
+        ).fetchall()
+        total = conn.execute(
+            "SELECT COUNT(*) FROM session_messages WHERE session_id = ?", (session_id,)
+        ).fetchone()[0]
+        return [{"seq": seq, "role": role, "content": content} for seq, role, content in reversed(rows)], total
+
+    def clear(self, session_id: str) -> int:
+        return self._connections.get().execute(
+            "DELETE FROM session_messages WHERE session_id = ?", (session_id,)
+        ).rowcount
+
+class MemorySessionHistory:
+    """
+    In-process fallback with the same interface as SQLiteSessionHistory.
+    Keeps the most recently active `max_sessions` sessions.
+    """
+
+    def __init__(self, max_sessions: int = 1024):
+        self.max_sessions = max_sessions
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def append(self, session_id: str, messages: List[dict]):
+        with self._lock:
+            history = self._sessions.pop(session_id, [])
+            start = len(history)
+            history.extend({"seq": start + i, "role": m["role"], "content": m["content"]}
+                           for i, m in enumerate(messages))
+            # Re-inserting keeps the dict ordered by last activity
+            self._sessions[session_id] = history
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.pop(next(iter(self._sessions)))
+
+    def page(self, session_id: str, before: Optional[int], limit: int) -> Tuple[List[dict], int]:
+        with self._lock:
+            history = self._sessions.get(session_id, [])
+            end = len(history) if before is None else max(0, min(before, len(history)))
+            return list(history[max(0, end - limit):end]), len(history)
+
+    def clear(self, session_id: str) -> int:
+        with self._lock:
+            return len(self._sessions.pop(session_id, []))
+
+_cache = None
+_session_history = None
+
+def get_cache():
+    """
+    Returns the shared SQLite cache when SHARED_STORE_PATH is set,
+    otherwise a per-process in-memory cache.
+    """
+    global _cache
+    if _cache is None:
+        _cache = SQLiteCache(settings.SHARED_STORE_PATH) if settings.SHARED_STORE_PATH else MemoryCache()
+    return _cache
+
+def get_session_history():
+    """
+    Returns the shared SQLite session history when SHARED_STORE_PATH is set,
+    otherwise a per-process in-memory one.
+    """
+    global _session_history
+    if _session_history is None:
+        _session_history = (
+            SQLiteSessionHistory(settings.SHARED_STORE_PATH) if settings.SHARED_STORE_PATH else MemorySessionHistory()
+        )
+    return _session_history
+
+def rate_limit_storage_uri() -> str:
+    if settings.SHARED_STORE_PATH:
+        return f"sqlite://{Path(settings.SHARED_STORE_PATH).resolve()}"
+    return "memory://"
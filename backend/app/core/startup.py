@@ -0,0 +1,111 @@
+import logging
+import threading
+import time
+from app.core.config import settings
+from app.core.metrics import STARTUP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_ready = threading.Event()
+_warmup_thread = None
+_warmup_error = None
+_warmup_failed = False
+_attempts = 0
+_phases = {}
+
+def _import_agent():
+    # langchain, langgraph and the OpenAI client are only imported here,
+    # so the server can bind its port before paying for them
+    import app.agent.graph  # noqa: F401
+    import app.rag.ingest  # noqa: F401
+
+def _load_embeddings():
+    from app.rag.vector_store import get_embeddings
+    get_embeddings()
+
+def _load_index():
+    from app.rag.vector_store import get_vector_store
+    get_vector_store()
+
+def _load_tokenizer():
+    # Fetch the tiktoken encoding now rather than on the first upload
+    from app.rag.chunking import get_chunking_config, length_function
+    length_function(get_chunking_config())
+
+WARMUP_PHASES = (
+    ("embeddings", _load_embeddings),
+    ("index", _load_index),
+    ("tokenizer", _load_tokenizer),
+    ("agent", _import_agent),
+)
+
+def _run_phases():
+    for phase, load in WARMUP_PHASES:
+        # Phases that finished in an earlier attempt are not repeated
+        if phase in _phases:
+            continue
+        start = time.perf_counter()
+        load()
+        _phases[phase] = time.perf_counter() - start
+        STARTUP_SECONDS.labels(phase=phase).set(_phases[phase])
+        logger.info(f"Warm-up: {phase} ready in {_phases[phase]:.2f}s")
+
+def warm_up() -> bool:
+    """
+    Loads the embedding model, the vector index and the agent modules,
+    recording how long each phase took. Marks the app ready when done.
+
+    A failed phase (say, the model download timing out) is retried up to
+    WARMUP_MAX_ATTEMPTS times with exponential backoff. Returns False once
+    every attempt has failed; the status is then "failed" for good.
+    """
+    global _warmup_error, _warmup_failed, _attempts
+    delay = settings.WARMUP_RETRY_BACKOFF
+    while True:
+        _attempts += 1
+        try:
+            _run_phases()
+        except Exception as e:
+            _warmup_error = e
+            if _attempts >= settings.WARMUP_MAX_ATTEMPTS:
+                _warmup_failed = True
+                logger.error(f"Warm-up failed after {_attempts} attempts: {e}", exc_info=True)
+                return False
+            logger.warning(f"Warm-up attempt {_attempts} failed, retrying in {delay:g}s: {e}")
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
+            continue
+        _warmup_error = None
+        _ready.set()
+        logger.info(f"Warm-up complete in {sum(_phases.values()):.2f}s")
+        return True
+
+def start_background_warmup():
+    """
+    Starts warm_up() in a daemon thread so the server accepts connections
+    (and answers /health) while the model and index load.
+    """
+    global _warmup_thread
+    # Already warm when gunicorn preloaded the app before forking
+    if _warmup_thread is None and not is_ready():
+        _warmup_thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+        _warmup_thread.start()
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+def warmup_failed() -> bool:
+    """True once warm-up has given up; the process needs a restart."""
+    return _warmup_failed
+
+def warmup_error() -> str:
+    return str(_warmup_error) if _warmup_error else ""
+
+def readiness() -> dict:
+    status = "ready" if is_ready() else "failed" if _warmup_failed else "warming"
+    report = {"status": status, "phases": {name: round(seconds, 3) for name, seconds in _phases.items()}}
+    if _warmup_error:
+        # While retrying this is the last attempt's error
+        report["error"] = str(_warmup_error)
+        report["attempts"] = _attempts
+    return report
@@ -1,4 +1,5 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import os
@@ -6,26 +7,32 @@ import logging
 from contextlib import asynccontextmanager
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest, multiprocess
+from app.core.config import settings
 from app.core.limiter import limiter
-from app.rag.vector_store import get_embeddings, get_vector_store
+from app.core.metrics import TraceIdMiddleware, install_trace_logging
+from app.core.startup import readiness, start_background_warmup, warm_up, warmup_error, warmup_failed
 
 load_dotenv()
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
+if settings.TRACE_IDS_ENABLED:
+    install_trace_logging()
 logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up RAG Agent API...")
-    logger.info("Loading HuggingFace embeddings model...")
-    get_embeddings()
-    logger.info("Embeddings model loaded and warmed up.")
-    logger.info("Loading vector store...")
-    get_vector_store()
-    logger.info("Vector store loaded.")
-    logger.info("Startup complete.")
+    if settings.BACKGROUND_WARMUP:
+        # Bind the port right away; /ready reports when the model and index are loaded
+        logger.info("Loading embeddings model, vector store and agent in the background...")
+        start_background_warmup()
+    else:
+        if not warm_up():
+            raise RuntimeError(f"Startup failed: {warmup_error()}")
+        logger.info("Startup complete.")
     yield
     # Shutdown
     logger.info("Shutting down...")
@@ -51,6 +58,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.TRACE_IDS_ENABLED:
+    app.add_middleware(TraceIdMiddleware)
+
 from app.api.routes import router as api_router
 app.include_router(api_router, prefix="/api")
 
@@ -60,8 +70,36 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    """
+    Liveness: the process is up and serving, even while still warming up.
+    503 once warm-up has failed for good, so the process gets restarted.
+    """
+    if warmup_failed():
+        return JSONResponse({"status": "failed", "error": warmup_error()}, status_code=503)
     return {"status": "ok"}
 
+@app.get("/ready")
+async def ready_check():
+    """
+    Readiness: the embedding model, vector index and agent are loaded.
+    503 while warming up (or if warm-up failed), with per-phase timings.
+    """
+    report = readiness()
+    return JSONResponse(report, status_code=200 if report["status"] == "ready" else 503)
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics: node and stage latency, LLM tokens,
+    context length and cache hit rates.
+    Under gunicorn (PROMETHEUS_MULTIPROC_DIR set) all workers are aggregated.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
     import uvicorn
     
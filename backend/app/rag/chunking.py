@@ -0,0 +1,157 @@
+import logging
+import math
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_text_splitters import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
+from pydantic import BaseModel
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("auto", "recursive", "markdown", "pdf_layout")
+
+# Rough characters per token for English text, used when tiktoken cannot load
+CHARS_PER_TOKEN = 4
+
+MARKDOWN_HEADERS = [("#", "h1"), ("##", "h2"), ("###", "h3")]
+
+class ChunkingConfig(BaseModel):
+    strategy: str = "auto"
+    chunk_size: int = 256
+    chunk_overlap: int = 20
+    # "tokens" measures sizes with tiktoken, "chars" with len()
+    unit: str = "tokens"
+    encoding: str = "cl100k_base"
+    # Parent section size for parent-document retrieval (None disables it)
+    parent_chunk_size: Optional[int] = None
+
+def get_chunking_config(collection: Optional[str] = None) -> ChunkingConfig:
+    """
+    Returns the chunking settings for a collection.
+    Collections without an entry in CHUNKING_COLLECTIONS use the global defaults.
+    """
+    config = ChunkingConfig(
+        strategy=settings.CHUNK_STRATEGY,
+        chunk_size=settings.CHUNK_SIZE,
+        chunk_overlap=settings.CHUNK_OVERLAP,
+        unit=settings.CHUNK_UNIT,
+        parent_chunk_size=settings.PARENT_CHUNK_SIZE,
+    )
+    overrides = settings.CHUNKING_COLLECTIONS.get(collection or "default", {})
+    return config.model_copy(update=overrides)
+
+def _estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+@lru_cache(maxsize=4)
+def _token_counter(encoding: str):
+    # tiktoken downloads the encoding on first use; offline (and without a
+    # pre-fetched TIKTOKEN_CACHE_DIR) estimate tokens from characters instead
+    try:
+        import tiktoken
+        enc = tiktoken.get_encoding(encoding)
+    except Exception as e:
+        logger.warning(
+            f"Could not load tiktoken encoding {encoding} ({e}); "
+            f"estimating tokens as characters / {CHARS_PER_TOKEN}"
+        )
+        return _estimate_tokens
+    return lambda text: len(enc.encode(text, disallowed_special=()))
+
+def length_function(config: ChunkingConfig):
+    if config.unit == "tokens":
+        return _token_counter(config.encoding)
+    return len
+
+def token_counter(config: ChunkingConfig):
+    """
+    Counts tokens for token budgets (PARENT_CONTEXT_TOKENS): with tiktoken
+    when chunks are measured in tokens, otherwise estimated from characters
+    so CHUNK_UNIT=chars never needs the tiktoken encoding.
+    """
+    if config.unit == "tokens":
+        return _token_counter(config.encoding)
+    return _estimate_tokens
+
+def _size_splitter(config: ChunkingConfig, separators: Optional[List[str]] = None):
+    kwargs = {"separators": separators} if separators else {}
+    return RecursiveCharacterTextSplitter(
+        chunk_size=config.chunk_size,
+        chunk_overlap=config.chunk_overlap,
+        length_function=length_function(config),
+        **kwargs
+    )
+
+def _split_markdown(documents: List[Document], config: ChunkingConfig) -> List[Document]:
+    # Split on headings first so chunks never straddle two sections, then
+    # bound each section by size. Headings stay in the text for retrieval.
+    header_splitter = MarkdownHeaderTextSplitter(MARKDOWN_HEADERS, strip_headers=False)
+    sections = []
+    for document in documents:
+        for section in header_splitter.split_text(document.page_content):
+            section.metadata = {**document.metadata, **section.metadata}
+            sections.append(section)
+    return _size_splitter(config).split_documents(sections)
+
+_HYPHENATED_BREAK = re.compile(r"(\w)-\n(\w)")
+_SOFT_LINE_BREAK = re.compile(r"(?<![.!?:;\n])\n(?=[a-z(])")
+
+def reflow_pdf_text(text: str) -> str:
+    """
+    Rebuilds paragraphs from PDF-extracted text, where every visual line
+    ends in a newline: rejoins hyphenated words and soft line breaks.
+    """
+    text = _HYPHENATED_BREAK.sub(r"\1\2", text)
+    return _SOFT_LINE_BREAK.sub(" ", text)
+
+def _split_pdf_layout(documents: List[Document], config: ChunkingConfig) -> List[Document]:
+    # PyPDFLoader yields one document per page; splitting each page on its
+    # own keeps chunks inside page boundaries so page citations stay exact.
+    pages = [
+        Document(page_content=reflow_pdf_text(page.page_content), metadata=page.metadata)
+        for page in documents
+    ]
+    splitter = _size_splitter(config, separators=["\n\n", "\n", ". ", " ", ""])
+    return splitter.split_documents(pages)
+
+def resolve_strategy(strategy: str, suffix: str) -> str:
+    if strategy != "auto":
+        return strategy
+    suffix = suffix.lower()
+    if suffix == ".md":
+        return "markdown"
+    if suffix == ".pdf":
+        return "pdf_layout"
+    return "recursive"
+
+def split_documents(documents: List[Document], suffix: str, config: ChunkingConfig) -> List[Document]:
+    """
+    Splits loaded documents into chunks using the configured strategy.
+    """
+    strategy = resolve_strategy(config.strategy, suffix)
+    if strategy == "markdown":
+        splits = _split_markdown(documents, config)
+    elif strategy == "pdf_layout":
+        splits = _split_pdf_layout(documents, config)
+    elif strategy == "recursive":
+        splits = _size_splitter(config).split_documents(documents)
+    else:
+        raise ValueError(f"Unknown chunking strategy '{strategy}', expected one of {STRATEGIES}")
+    return [split for split in splits if split.page_content.strip()]
+
+def split_parents_and_children(documents: List[Document], suffix: str, config: ChunkingConfig) -> Tuple[List[Document], List[List[Document]]]:
+    """
+    Splits documents into parent sections of parent_chunk_size with the
+    configured strategy, then each parent into child chunks of chunk_size.
+    Returns the parents and, for each parent, its children.
+    """
+    parent_config = config.model_copy(update={"chunk_size": config.parent_chunk_size, "chunk_overlap": 0})
+    parents = split_documents(documents, suffix, parent_config)
+    child_splitter = _size_splitter(config)
+    children = [
+        [child for child in child_splitter.split_documents([parent]) if child.page_content.strip()]
+        for parent in parents
+    ]
+    return parents, children
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from app.core.config import settings
+from app.core.shared_store import file_lock
+
+logger = logging.getLogger(__name__)
+
+# Tombstones map a deleted document id to the number of chunks it still
+# occupies in the FAISS index until the next compaction.
+_tombstones = None
+_tombstones_mtime = None
+_tombstones_lock = threading.Lock()
+_compaction_thread = None
+
+def get_index_path() -> Path:
+    return Path(settings.CHROMA_PERSIST_DIRECTORY) / "faiss_index"
+
+def _tombstones_path() -> Path:
+    return get_index_path() / "tombstones.json"
+
+def document_key(metadata: dict) -> str:
+    """
+    Returns the document id a chunk belongs to.
+    Chunks ingested before document ids existed are grouped by their source path.
+    """
+    if metadata.get("doc_id"):
+        return metadata["doc_id"]
+    source = str(metadata.get("source", ""))
+    return "legacy-" + hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+
+def _load_tombstones() -> dict:
+    global _tombstones, _tombstones_mtime
+    # Other worker processes may have changed the file since it was cached
+    path = _tombstones_path()
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    if _tombstones is None or mtime != _tombstones_mtime:
+        if mtime is not None:
+            with open(path) as f:
+                _tombstones = json.load(f)
+        else:
+            _tombstones = {}
+        _tombstones_mtime = mtime
+    return _tombstones
+
+@contextmanager
+def _tombstones_update():
+    """
+    Locks the tombstones for a read-modify-write across threads and worker
+    processes, yields the current mapping and saves it afterwards.
+    """
+    with _tombstones_lock, file_lock(_tombstones_path().with_suffix(".lock")):
+        yield _load_tombstones()
+        _save_tombstones()
+
+def _save_tombstones():
+    global _tombstones_mtime
+    path = _tombstones_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(_tombstones, f)
+    tmp_path.replace(path)
+    _tombstones_mtime = path.stat().st_mtime_ns
+
+def get_tombstones() -> dict:
+    """
+    Returns a snapshot of tombstoned document ids and their chunk counts.
+    """
+    with _tombstones_lock:
+        return dict(_load_tombstones())
+
+def search_kwargs(k: int) -> dict:
+    """
+    Returns FAISS search kwargs that mask tombstoned documents.
+    fetch_k is widened by the number of masked chunks so k live results
+    are always returned when they exist.
+    """
+    tombstones = get_tombstones()
+    if not tombstones:
+        return {"k": k}
+    masked = set(tombstones)
+    return {
+        "k": k,
+        "fetch_k": k + sum(tombstones.values()),
+        "filter": lambda metadata: document_key(metadata) not in masked,
+    }
+
+def _group_chunks(vector_store) -> dict:
+    groups = {}
+    for chunk_id, doc in vector_store.docstore._dict.items():
+        if doc.metadata.get("source") == "init":
+            continue
+        key = document_key(doc.metadata)
+        group = groups.setdefault(key, {
+            "id": key,
+            "filename": doc.metadata.get("filename") or doc.metadata.get("title") or Path(str(doc.metadata.get("source", ""))).name,
+            "collection": doc.metadata.get("collection", "default"),
+            "chunk_ids": [],
+            "size_bytes": 0,
+        })
+        group["chunk_ids"].append(chunk_id)
+        group["size_bytes"] += len(doc.page_content.encode("utf-8"))
+    return groups
+
+def list_documents(vector_store) -> list:
+    """
+    Lists indexed documents with their chunk counts and sizes.
+    size_bytes counts chunk text, vector_bytes the vectors held by the index.
+    """
+    from app.rag.quantization import bytes_per_vector
+
+    tombstones = get_tombstones()
+    vector_size = bytes_per_vector(vector_store.index)
+    documents = []
+    for group in _group_chunks(vector_store).values():
+        if group["id"] in tombstones:
+            continue
+        chunk_ids = group.pop("chunk_ids")
+        group["chunks"] = len(chunk_ids)
+        group["vector_bytes"] = len(chunk_ids) * vector_size
+        documents.append(group)
+    return documents
+
+def delete_document(vector_store, doc_id: str) -> dict:
+    """
+    Tombstones a document so its chunks are masked at query time.
+    Schedules a background compaction once enough of the index is tombstoned.
+    """
+    group = _group_chunks(vector_store).get(doc_id)
+    if group is None:
+        raise KeyError(doc_id)
+
+    with _tombstones_update() as tombstones:
+        # Already deleted, only waiting for compaction
+        if doc_id in tombstones:
+            raise KeyError(doc_id)
+        tombstones[doc_id] = len(group["chunk_ids"])
+        masked_chunks = sum(tombstones.values())
+
+    total_chunks = max(vector_store.index.ntotal, 1)
+    ratio = masked_chunks / total_chunks
+    logger.info(f"🗑️ DELETE: Tombstoned {doc_id} ({len(group['chunk_ids'])} chunks), tombstone ratio {ratio:.2f}")
+    if ratio >= settings.COMPACTION_TOMBSTONE_RATIO:
+        schedule_compaction()
+
+    return {"id": doc_id, "chunks": len(group["chunk_ids"]), "status": "deleted"}
+
+def compact_index():
+    """
+    Physically removes tombstoned chunks from the FAISS index and saves it.
+    """
+    from app.rag.vector_store import index_manager
+
+    tombstones = get_tombstones()
+    if not tombstones:
+        return 0
+
+    # Compact a private copy so concurrent readers never see a half-deleted index
+    with index_manager.writer() as vector_store:
+        groups = _group_chunks(vector_store)
+        chunk_ids = [
+            chunk_id
+            for doc_id in tombstones
+            for chunk_id in groups.get(doc_id, {}).get("chunk_ids", [])
+        ]
+        if chunk_ids:
+            vector_store.delete(chunk_ids)
+
+    # Parent sections are only reachable through children, which are gone now.
+    # parents.db can outlive PARENT_CHUNK_SIZE being turned off, but is not
+    # created when it never existed
+    from app.rag.parents import PARENTS_DB, get_parent_store, parent_retrieval_enabled
+    if parent_retrieval_enabled() or (get_index_path() / PARENTS_DB).exists():
+        get_parent_store().delete_documents(tombstones)
+
+    # Only lift tombstones once the compacted generation is published
+    with _tombstones_update() as current:
+        for doc_id in tombstones:
+            current.pop(doc_id, None)
+
+    logger.info(f"🧹 COMPACT: Removed {len(chunk_ids)} chunks of {len(tombstones)} deleted documents")
+    return len(chunk_ids)
+
+def _run_compaction():
+    global _compaction_thread
+    try:
+        compact_index()
+    except Exception as e:
+        logger.error(f"Index compaction failed: {e}", exc_info=True)
+    finally:
+        _compaction_thread = None
+
+def schedule_compaction():
+    """
+    Starts a background compaction unless one is already running.
+    """
+    global _compaction_thread
+    with _tombstones_lock:
+        if _compaction_thread is not None:
+            return
+        _compaction_thread = threading.Thread(target=_run_compaction, name="index-compaction", daemon=True)
+    _compaction_thread.start()
@@ -0,0 +1,165 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "int8", "onnx")
+
+def load_model(model_name: str, backend: str = "torch"):
+    """
+    Loads a SentenceTransformer model on CPU with the requested backend.
+
+    - torch: plain PyTorch float32
+    - int8: PyTorch with dynamically quantized int8 Linear layers
+    - onnx: ONNX Runtime (needs `pip install sentence-transformers[onnx]`)
+    """
+    from sentence_transformers import SentenceTransformer
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {BACKENDS}")
+
+    if backend == "onnx":
+        try:
+            return SentenceTransformer(model_name, device="cpu", backend="onnx")
+        except ImportError as e:
+            raise ValueError(
+                "EMBEDDING_BACKEND=onnx needs onnxruntime and optimum: "
+                "pip install 'sentence-transformers[onnx]'"
+            ) from e
+
+    model = SentenceTransformer(model_name, device="cpu")
+    if backend == "int8":
+        import torch
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+class _Request:
+    __slots__ = ("text", "future")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.future = Future()
+
+class EmbeddingEngine(Embeddings):
+    """
+    CPU embedding engine with dynamic micro-batching.
+
+    Concurrent embed_query calls (one per chat request) are queued and merged
+    into a single forward pass: the batcher waits at most batch_window_ms after
+    the first query for others to arrive, up to max_batch_size queries.
+
+    embed_documents encodes the whole input in one call. SentenceTransformer
+    sorts the texts by length before batching, so each batch of batch_size is
+    padded only to its own longest text.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        backend: str = "torch",
+        batch_window_ms: float = 5.0,
+        max_batch_size: int = 64,
+        batch_size: int = 64,
+        num_threads: Optional[int] = None,
+    ):
+        if num_threads:
+            import torch
+            torch.set_num_threads(num_threads)
+        self.model = load_model(model_name, backend)
+        self.backend = backend
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_pid = None
+        self._worker_lock = threading.Lock()
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return vectors.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._encode(list(texts))
+
+    def embed_query(self, text: str, timeout: Optional[float] = None) -> List[float]:
+        """
+        Embeds one query. With micro-batching on, raises TimeoutError if the
+        batch has not been encoded within `timeout` seconds.
+        """
+        if self.batch_window <= 0:
+            return self._encode([text])[0]
+        self._ensure_worker()
+        request = _Request(text)
+        self._queue.put(request)
+        return request.future.result(timeout)
+
+    def embed_queries(self, texts: List[str], timeout: Optional[float] = None) -> List[List[float]]:
+        """
+        Embeds several queries (e.g. the sub-queries of one question). They
+        go through the micro-batcher together, so usually one forward pass,
+        and share the `timeout` the way embed_query does.
+        """
+        if self.batch_window <= 0:
+            return self._encode(list(texts))
+        self._ensure_worker()
+        pending = [_Request(text) for text in texts]
+        for request in pending:
+            self._queue.put(request)
+        end = None if timeout is None else time.monotonic() + timeout
+        return [
+            request.future.result(None if end is None else max(0.0, end - time.monotonic()))
+            for request in pending
+        ]
+
+    def _ensure_worker(self):
+        # The batcher thread does not survive a fork, so each process starts its own
+        pid = os.getpid()
+        if self._worker_pid == pid:
+            return
+        with self._worker_lock:
+            if self._worker_pid == pid:
+                return
+            self._queue = queue.Queue()
+            self._worker = threading.Thread(target=self._batch_loop, name="embedding-batcher", daemon=True)
+            self._worker.start()
+            self._worker_pid = pid
+
+    def _batch_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                vectors = self._encode([request.text for request in batch])
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            for request, vector in zip(batch, vectors):
+                request.future.set_result(vector)
+
+    def warmup(self):
+        self._encode(["warmup"])
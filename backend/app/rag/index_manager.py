@@ -0,0 +1,268 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+from app.core.metrics import record_cache
+from app.core.shared_store import file_lock
+
+logger = logging.getLogger(__name__)
+
+class IndexGeneration:
+    """
+    An immutable snapshot of the FAISS index.
+    Readers pin a generation for the duration of a search; once a newer
+    generation is published and the last reader leaves, the manager drops
+    it and the store is freed when no caller holds it any more.
+    """
+
+    def __init__(self, number: int, store, version: int = 0):
+        self.number = number
+        self.store = store
+        # On-disk VERSION this generation was loaded from or saved as
+        self.version = version
+        self.readers = 0
+        self.retired = False
+        self.released = False
+
+class IndexManager:
+    """
+    Versioned index manager.
+
+    Writers build a new generation from a copy of the current one and publish
+    it atomically; readers never observe a half-written index and never wait
+    on a reload.
+
+    Several worker processes may share one index directory: every save bumps
+    a VERSION file under a cross-process file lock, writers catch up with the
+    disk before copying, and readers pick up other workers' saves in the
+    background every refresh_seconds.
+    """
+
+    def __init__(self, index_path: Path, load_fn, create_fn, refresh_seconds: float = 2.0):
+        self.index_path = Path(index_path)
+        self._load_fn = load_fn
+        self._create_fn = create_fn
+        self.refresh_seconds = refresh_seconds
+        self._current = None
+        self._next_number = 1
+        self._last_check = 0.0
+        self._refreshing = False
+        # Guards generation swaps and reader counts
+        self._lock = threading.Lock()
+        # Single-flight guard for the initial load
+        self._load_lock = threading.Lock()
+        # Serializes writers (ingestion, compaction)
+        self._write_lock = threading.Lock()
+        # Re-entrant holder of the cross-process file lock
+        self._process_lock = threading.RLock()
+        self._lock_depth = 0
+
+    def _index_exists(self) -> bool:
+        return (self.index_path / "index.faiss").exists()
+
+    @property
+    def _lock_path(self) -> Path:
+        return self.index_path.with_name(self.index_path.name + ".lock")
+
+    @property
+    def _version_path(self) -> Path:
+        return self.index_path / "VERSION"
+
+    def disk_version(self) -> int:
+        try:
+            return int(self._version_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    @contextmanager
+    def _interprocess(self):
+        """
+        Holds the cross-process index lock. Re-entrant within the process so
+        save() can be called both on its own and from inside a writer.
+        """
+        with self._process_lock:
+            self._lock_depth += 1
+            try:
+                if self._lock_depth == 1:
+                    with file_lock(self._lock_path):
+                        yield
+                else:
+                    yield
+            finally:
+                self._lock_depth -= 1
+
+    def _load_from_disk(self):
+        with self._interprocess():
+            version = self.disk_version()
+            if self._index_exists():
+                # Do not swallow load errors: silently replacing a corrupt or
+                # unreadable index with an empty one would lose every document.
+                store = self._load_fn(self.index_path)
+            else:
+                store = self._create_fn()
+                self.save(store)
+            # load_fn may have converted and saved the index
+            return store, max(version, self.disk_version())
+
+    def _ensure_loaded(self) -> IndexGeneration:
+        current = self._current
+        record_cache("index", current is not None)
+        if current is not None:
+            self._maybe_refresh(current)
+            return current
+        with self._load_lock:
+            # Another thread may have finished loading while we waited
+            if self._current is not None:
+                return self._current
+            store, version = self._load_from_disk()
+            logger.info(f"Loaded vector index with {store.index.ntotal} vectors")
+            self.publish(store, save=False, version=version)
+            return self._current
+
+    def _maybe_refresh(self, current: IndexGeneration):
+        """
+        Starts a background reload when another process saved a newer index.
+        Readers keep searching the current generation meanwhile.
+        """
+        if not self.refresh_seconds:
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.refresh_seconds:
+            return
+        self._last_check = now
+        if self.disk_version() == current.version:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, daemon=True).start()
+
+    def _refresh(self):
+        try:
+            with self._write_lock:
+                current = self._current
+                if current is None or self.disk_version() == current.version:
+                    return
+                store, version = self._load_from_disk()
+                logger.info(f"Reloading vector index saved by another process (version {version})")
+                self.publish(store, save=False, version=version)
+        except Exception:
+            logger.exception("Failed to reload the vector index")
+        finally:
+            self._refreshing = False
+
+    def reset(self, index_path: Optional[Path] = None):
+        """
+        Drops the loaded generation (optionally pointing at another index
+        directory); the next reader loads from disk again.
+        """
+        with self._write_lock, self._load_lock, self._lock:
+            if index_path is not None:
+                self.index_path = Path(index_path)
+            self._current = None
+
+    def current(self) -> IndexGeneration:
+        """
+        Returns the current generation without pinning it.
+        """
+        return self._ensure_loaded()
+
+    @contextmanager
+    def reader(self):
+        """
+        Pins the current generation while the caller searches it.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            generation = self._current
+            generation.readers += 1
+        try:
+            yield generation.store
+        finally:
+            with self._lock:
+                generation.readers -= 1
+                self._free_if_unused(generation)
+
+    @contextmanager
+    def writer(self):
+        """
+        Yields a private copy of the current index. On a clean exit the copy
+        is saved and published as the next generation.
+        """
+        with self._write_lock:
+            current = self.current()
+            with self._interprocess():
+                # Start from the latest index on disk, which another worker
+                # process may have saved since this one last loaded it
+                if self.disk_version() != current.version:
+                    store, version = self._load_from_disk()
+                    current = self.publish(store, save=False, version=version)
+                store = copy_store(current.store)
+                yield store
+                self.publish(store)
+
+    def publish(self, store, save: bool = True, version: Optional[int] = None) -> IndexGeneration:
+        if save:
+            version = self.save(store)
+        with self._lock:
+            generation = IndexGeneration(self._next_number, store, version if version is not None else self.disk_version())
+            self._next_number += 1
+            previous, self._current = self._current, generation
+            if previous is not None:
+                previous.retired = True
+                self._free_if_unused(previous)
+        logger.info(f"Published index generation {generation.number} ({store.index.ntotal} vectors)")
+        return generation
+
+    def _free_if_unused(self, generation: IndexGeneration):
+        # The store is left to reference counting rather than set to None:
+        # callers of current() (or get_vector_store()) may still hold it
+        if generation.retired and generation.readers == 0 and not generation.released:
+            generation.released = True
+            logger.info(f"Released index generation {generation.number}")
+
+    def save(self, store) -> int:
+        """
+        Saves the store and returns the new on-disk version.
+        """
+        with self._interprocess():
+            # Write to a scratch directory first so a crash never leaves a
+            # half-written index behind, then move the files into place.
+            tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            store.save_local(str(tmp_path))
+            self.index_path.mkdir(parents=True, exist_ok=True)
+            for file in tmp_path.iterdir():
+                os.replace(file, self.index_path / file.name)
+            tmp_path.rmdir()
+            version = self.disk_version() + 1
+            self._version_path.write_text(str(version))
+            return version
+
+def copy_store(store):
+    """
+    Returns an independent copy of a FAISS vector store.
+    The index is copied through serialization, which also works for
+    read-only memory-mapped indexes that clone_index would keep as views.
+    """
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+
+    kwargs = {}
+    if hasattr(store, "full_vectors"):
+        kwargs["full_vectors"] = store.full_vectors.copy() if store.full_vectors is not None else None
+        kwargs["rescore_factor"] = store.rescore_factor
+    return type(store)(
+        store.embedding_function,
+        faiss.deserialize_index(faiss.serialize_index(store.index)),
+        InMemoryDocstore(dict(store.docstore._dict)),
+        dict(store.index_to_docstore_id),
+        normalize_L2=store._normalize_L2,
+        distance_strategy=store.distance_strategy,
+        **kwargs,
+    )
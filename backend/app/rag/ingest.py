@@ -1,15 +1,18 @@
 import shutil
+import uuid
 from pathlib import Path
 from tempfile import NamedTemporaryFile
 from fastapi import UploadFile
+from app.core.metrics import stage_timer
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from app.rag.vector_store import get_vector_store
-from app.core.config import settings
+from app.rag.chunking import get_chunking_config, split_documents, split_parents_and_children, token_counter
+from app.rag.parents import get_parent_store
+from app.rag.vector_store import get_embeddings, index_manager
 
-def ingest_document(file: UploadFile):
+def ingest_document(file: UploadFile, collection: str = "default"):
     """
     Ingests a document (PDF or text) into the vector store.
+    Chunking follows the settings of the given collection.
     """
     # Save uploaded file to a temporary file
     suffix = Path(file.filename).suffix
@@ -25,28 +28,67 @@ def ingest_document(file: UploadFile):
         else:
             raise ValueError(f"Unsupported file type: {suffix}")
 
-        documents = loader.load()
+        with stage_timer("ingest", "load"):
+            documents = loader.load()
         
         # Split text
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200
-        )
-        splits = text_splitter.split_documents(documents)
+        config = get_chunking_config(collection)
+        parent_ids = []
+        with stage_timer("ingest", "split"):
+            if config.parent_chunk_size:
+                # Only the small child chunks are embedded; the parent
+                # sections they expand to at query time go to the parent store
+                parents, children = split_parents_and_children(documents, suffix, config)
+                splits = [child for group in children for child in group]
+            else:
+                splits = split_documents(documents, suffix, config)
+        if not splits:
+            raise ValueError(f"No text could be extracted from {file.filename}")
         
-        # Add to vector store
-        vector_store = get_vector_store()
-        vector_store.add_documents(splits)
+        # Tag chunks with a document id so the document can be listed and deleted
+        doc_id = uuid.uuid4().hex
+        if config.parent_chunk_size:
+            parent_ids = [f"{doc_id}-p{i}" for i in range(len(parents))]
+            for parent_id, parent, group in zip(parent_ids, parents, children):
+                parent.metadata.update(doc_id=doc_id, filename=file.filename, collection=collection, parent_id=parent_id)
+                for child in group:
+                    child.metadata["parent_id"] = parent_id
+        for split in splits:
+            split.metadata["doc_id"] = doc_id
+            split.metadata["filename"] = file.filename
+            split.metadata["collection"] = collection
+        chunk_ids = [f"{doc_id}-{i}" for i in range(len(splits))]
         
-        # Save the updated index
-        vector_store_path = Path(settings.CHROMA_PERSIST_DIRECTORY) / "faiss_index"
-        vector_store.save_local(str(vector_store_path))
+        # Parents are stored before their children become searchable
+        if parent_ids:
+            count_tokens = token_counter(config)
+            with stage_timer("ingest", "parents"):
+                get_parent_store().add(parent_ids, parents, [count_tokens(parent.page_content) for parent in parents])
         
-        # Clear the cached vector store so next call reloads it
-        import app.rag.vector_store as vs
-        vs._vector_store_instance = None
+        try:
+            # Embed before taking the writer so other writers are not held up
+            texts = [split.page_content for split in splits]
+            with stage_timer("ingest", "embed"):
+                embeddings = get_embeddings().embed_documents(texts)
+            
+            # Add to a copy of the index; it is saved and published as a new
+            # generation while in-flight searches keep using the old one
+            with stage_timer("ingest", "index"), index_manager.writer() as vector_store:
+                vector_store.add_embeddings(
+                    zip(texts, embeddings),
+                    metadatas=[split.metadata for split in splits],
+                    ids=chunk_ids
+                )
+        except BaseException:
+            # Nothing references the parents if the children never got indexed
+            if parent_ids:
+                get_parent_store().delete_documents([doc_id])
+            raise
         
-        return {"filename": file.filename, "chunks": len(splits), "status": "success"}
+        result = {"id": doc_id, "filename": file.filename, "collection": collection, "chunks": len(splits), "status": "success"}
+        if parent_ids:
+            result["parents"] = len(parent_ids)
+        return result
 
     finally:
         # Cleanup temp file
@@ -0,0 +1,124 @@
+import json
+import logging
+from typing import Dict, Iterable, List, Tuple
+from langchain_core.documents import Document
+from app.core.config import settings
+from app.core.shared_store import _SQLiteConnections
+from app.rag.documents import get_index_path
+
+logger = logging.getLogger(__name__)
+
+PARENTS_DB = "parents.db"
+
+class ParentStore:
+    """
+    Parent sections for parent-document retrieval, keyed by parent id.
+    Only their child chunks are embedded in the FAISS index; each child
+    carries its parent's id in metadata["parent_id"]. SQLite in WAL mode,
+    so every worker process reads the same store.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS parents (
+            id TEXT PRIMARY KEY,
+            doc_id TEXT NOT NULL,
+            content TEXT NOT NULL,
+            metadata TEXT NOT NULL,
+            tokens INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS parents_doc_id ON parents (doc_id);
+    """
+
+    def __init__(self, path: str):
+        self._connections = _SQLiteConnections(path, self.SCHEMA)
+
+    def add(self, ids: List[str], parents: List[Document], tokens: List[int]):
+        conn = self._connections.get()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO parents (id, doc_id, content, metadata, tokens) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (parent_id, parent.metadata["doc_id"], parent.page_content, json.dumps(parent.metadata), count)
+                    for parent_id, parent, count in zip(ids, parents, tokens)
+                ],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, ids: List[str]) -> Dict[str, Tuple[Document, int]]:
+        """
+        Returns {parent_id: (parent document, token count)} for the ids found.
+        """
+        if not ids:
+            return {}
+        rows = self._connections.get().execute(
+            f"SELECT id, content, metadata, tokens FROM parents WHERE id IN ({','.join('?' * len(ids))})",
+            ids,
+        ).fetchall()
+        return {
+            parent_id: (Document(page_content=content, metadata=json.loads(metadata)), tokens)
+            for parent_id, content, metadata, tokens in rows
+        }
+
+    def delete_documents(self, doc_ids: Iterable[str]) -> int:
+        doc_ids = list(doc_ids)
+        if not doc_ids:
+            return 0
+        return self._connections.get().execute(
+            f"DELETE FROM parents WHERE doc_id IN ({','.join('?' * len(doc_ids))})", doc_ids
+        ).rowcount
+
+_stores = {}
+
+def get_parent_store() -> ParentStore:
+    """
+    The parent store next to the current FAISS index.
+    """
+    path = str(get_index_path() / PARENTS_DB)
+    if path not in _stores:
+        _stores[path] = ParentStore(path)
+    return _stores[path]
+
+def parent_retrieval_enabled() -> bool:
+    """
+    Whether any collection is ingested with parent sections.
+    """
+    return bool(settings.PARENT_CHUNK_SIZE) or any(
+        overrides.get("parent_chunk_size") for overrides in settings.CHUNKING_COLLECTIONS.values()
+    )
+
+def expand_to_parents(children: List[Document], k: int, token_budget: int) -> List[Document]:
+    """
+    Replaces child chunk hits with their parent sections, in the order of
+    each parent's best-ranked child. Parents are deduplicated and added
+    while they fit in `token_budget` (the first one always is), up to k.
+    Chunks without a parent (ingested without parent sections) are kept as is.
+    """
+    from app.rag.chunking import get_chunking_config, token_counter
+
+    parent_ids = [child.metadata["parent_id"] for child in children if child.metadata.get("parent_id")]
+    parents = get_parent_store().get(list(dict.fromkeys(parent_ids)))
+    count_tokens = token_counter(get_chunking_config())
+
+    results, seen, used = [], set(), 0
+    for child in children:
+        parent_id = child.metadata.get("parent_id")
+        if parent_id in seen:
+            continue
+        if parent_id in parents:
+            document, tokens = parents[parent_id]
+        else:
+            if parent_id:
+                logger.warning(f"Parent section {parent_id} is missing, using the child chunk")
+            document, tokens = child, count_tokens(child.page_content)
+        seen.add(parent_id or id(child))
+        if results and used + tokens > token_budget:
+            continue
+        results.append(document)
+        used += tokens
+        if len(results) >= k:
+            break
+    return results
@@ -0,0 +1,257 @@
+import logging
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+STORAGE_TYPES = ("float32", "float16", "int8")
+
+def build_index(dim: int, storage: str = "float32"):
+    """
+    Returns an empty L2 FAISS index storing vectors as float32, float16 or int8.
+    """
+    import faiss
+
+    if storage == "float32":
+        return faiss.IndexFlatL2(dim)
+    if storage == "float16":
+        return faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+    if storage == "int8":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+        # Embeddings are L2-normalized, so every component lies in [-1, 1].
+        # Training on that range means later additions are never clipped.
+        index.train(np.array([[-1.0] * dim, [1.0] * dim], dtype=np.float32))
+        return index
+    raise ValueError(f"Unknown vector storage '{storage}', expected one of {STORAGE_TYPES}")
+
+def index_storage(index) -> str:
+    import faiss
+
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16:
+            return "float16"
+        if index.sq.qtype == faiss.ScalarQuantizer.QT_8bit:
+            return "int8"
+    return "float32"
+
+def bytes_per_vector(index) -> int:
+    return index.sa_code_size()
+
+def convert_index(index, storage: str):
+    """
+    Re-encodes an index with a different storage type.
+    Returns the index unchanged if it already uses that storage.
+    """
+    current = index_storage(index)
+    if current == storage:
+        return index
+    if STORAGE_TYPES.index(storage) < STORAGE_TYPES.index(current):
+        logger.warning(f"Converting {current} index to {storage}: precision lost earlier is not recovered")
+    converted = build_index(index.d, storage)
+    if index.ntotal:
+        converted.add(index.reconstruct_n(0, index.ntotal))
+    logger.info(f"Converted {index.ntotal} vectors from {current} to {storage} storage")
+    return converted
+
+class FullPrecisionVectors:
+    """
+    float32 copies of the indexed vectors, keyed by docstore id, used to
+    rescore candidates from a quantized index.
+
+    Saved vectors are memory-mapped from disk, so only the rows touched by
+    rescoring are paged in; vectors added since the last save stay in RAM.
+    """
+
+    FILE_NAME = "full_vectors.npy"
+    IDS_FILE_NAME = "full_vectors_ids.npy"
+
+    def __init__(self, dim: int, matrix: Optional[np.ndarray] = None, rows: Optional[dict] = None):
+        self.dim = dim
+        self.matrix = matrix if matrix is not None else np.zeros((0, dim), dtype=np.float32)
+        self.rows = rows if rows is not None else {}
+        self.pending = {}
+
+    def __len__(self):
+        return len(self.rows) + len(self.pending)
+
+    def add(self, ids: List[str], vectors: np.ndarray):
+        for id_, vector in zip(ids, vectors):
+            self.pending[id_] = np.asarray(vector, dtype=np.float32)
+
+    def remove(self, ids: Iterable[str]):
+        for id_ in ids:
+            self.rows.pop(id_, None)
+            self.pending.pop(id_, None)
+
+    def get(self, ids: List[str]) -> np.ndarray:
+        return np.stack([
+            self.pending[id_] if id_ in self.pending else self.matrix[self.rows[id_]]
+            for id_ in ids
+        ])
+
+    def has(self, id_: str) -> bool:
+        return id_ in self.rows or id_ in self.pending
+
+    def saved_bytes(self) -> int:
+        """
+        Size of the saved (memory-mapped) float32 matrix. It is on disk, and
+        up to all of it is resident once rescoring has touched every row.
+        """
+        return self.matrix.nbytes
+
+    def pending_bytes(self) -> int:
+        """float32 vectors added since the last save, held in RAM."""
+        return len(self.pending) * self.dim * 4
+
+    def copy(self) -> "FullPrecisionVectors":
+        copied = FullPrecisionVectors(self.dim, self.matrix, dict(self.rows))
+        copied.pending = dict(self.pending)
+        return copied
+
+    def save(self, folder: Path):
+        ids = list(self.rows) + list(self.pending)
+        matrix = self.get(ids) if ids else np.zeros((0, self.dim), dtype=np.float32)
+        np.save(folder / self.FILE_NAME, matrix)
+        np.save(folder / self.IDS_FILE_NAME, np.array(ids, dtype=object), allow_pickle=True)
+        # Page the saved vectors back in lazily instead of keeping them in RAM
+        self.matrix = np.load(folder / self.FILE_NAME, mmap_mode="r")
+        self.rows = {id_: row for row, id_ in enumerate(ids)}
+        self.pending = {}
+
+    @classmethod
+    def load(cls, folder: Path, dim: int) -> Optional["FullPrecisionVectors"]:
+        if not (folder / cls.FILE_NAME).exists():
+            return None
+        matrix = np.load(folder / cls.FILE_NAME, mmap_mode="r")
+        ids = np.load(folder / cls.IDS_FILE_NAME, allow_pickle=True)
+        return cls(dim, matrix, {id_: row for row, id_ in enumerate(ids)})
+
+class QuantizedFAISS(FAISS):
+    """
+    FAISS vector store that can hold scalar-quantized (int8) or float16
+    vectors and optionally rescore the top candidates at full precision.
+
+    With rescore_factor > 0, a search fetches k * rescore_factor candidates
+    from the quantized index and re-ranks them by exact L2 distance using
+    the float32 vectors in full_vectors.
+    """
+
+    def __init__(self, *args, full_vectors: Optional[FullPrecisionVectors] = None, rescore_factor: int = 0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.full_vectors = full_vectors
+        self.rescore_factor = rescore_factor
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        return self.add_embeddings(zip(texts, self._embed_documents(texts)), metadatas=metadatas, ids=ids)
+
+    def add_embeddings(self, text_embeddings: Iterable[Tuple[str, List[float]]], metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        text_embeddings = list(text_embeddings)
+        ids = super().add_embeddings(text_embeddings, metadatas=metadatas, ids=ids, **kwargs)
+        if self.full_vectors is not None:
+            self.full_vectors.add(ids, np.array([embedding for _, embedding in text_embeddings], dtype=np.float32))
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        result = super().delete(ids, **kwargs)
+        if self.full_vectors is not None:
+            self.full_vectors.remove(ids)
+        return result
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4, filter=None, fetch_k: int = 20, **kwargs: Any):
+        if not self.rescore_factor or self.full_vectors is None:
+            return super().similarity_search_with_score_by_vector(embedding, k=k, filter=filter, fetch_k=fetch_k, **kwargs)
+
+        candidate_k = k * self.rescore_factor
+        candidates = super().similarity_search_with_score_by_vector(
+            embedding, k=candidate_k, filter=filter, fetch_k=max(fetch_k, candidate_k), **kwargs
+        )
+        return self._rescore(embedding, candidates, k)
+
+    def _rescore(self, embedding: List[float], candidates: List[Tuple[Document, float]], k: int):
+        candidates = [(doc, score) for doc, score in candidates if self.full_vectors.has(doc.id)]
+        if not candidates:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        vectors = self.full_vectors.get([doc.id for doc, _ in candidates])
+        distances = ((vectors - query) ** 2).sum(axis=1)
+        order = np.argsort(distances)[:k]
+        return [(candidates[i][0], float(distances[i])) for i in order]
+
+    def batch_similarity_search_by_vectors(self, embeddings: List[List[float]], k: int = 4, filter=None, fetch_k: int = 20) -> List[List[Document]]:
+        """
+        similarity_search_by_vector for several queries with a single
+        index.search call, which FAISS parallelizes across the query rows.
+        Returns one ranked list per query.
+        """
+        import faiss
+
+        rescore = bool(self.rescore_factor and self.full_vectors is not None)
+        candidate_k = k * self.rescore_factor if rescore else k
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if self._normalize_L2:
+            vectors = vectors.copy()
+            faiss.normalize_L2(vectors)
+        _, indices = self.index.search(vectors, candidate_k if filter is None else max(fetch_k, candidate_k))
+        filter_func = self._create_filter_func(filter) if filter is not None else None
+
+        results = []
+        for embedding, row in zip(embeddings, indices):
+            candidates = []
+            for i in row:
+                if i == -1:
+                    continue
+                doc = self.docstore.search(self.index_to_docstore_id[i])
+                if filter_func is None or filter_func(doc.metadata):
+                    candidates.append((doc, 0.0))
+            candidates = candidates[:candidate_k]
+            if rescore:
+                candidates = self._rescore(embedding, candidates, k)
+            results.append([doc for doc, _ in candidates[:k]])
+        return results
+
+    def save_local(self, folder_path: str, index_name: str = "index") -> None:
+        super().save_local(folder_path, index_name)
+        if self.full_vectors is not None:
+            self.full_vectors.save(Path(folder_path))
+
+    @classmethod
+    def load_local(cls, folder_path: str, embeddings, index_name: str = "index", **kwargs: Any) -> "QuantizedFAISS":
+        store = super().load_local(folder_path, embeddings, index_name, **kwargs)
+        store.full_vectors = FullPrecisionVectors.load(Path(folder_path), store.index.d)
+        return store
+
+def configure_store(store: QuantizedFAISS, storage: str, rescore_factor: int) -> bool:
+    """
+    Applies the configured storage type and rescoring to a loaded store.
+    Returns True if the index had to be converted and should be saved.
+    """
+    changed = False
+    full_precision = index_storage(store.index) == "float32"
+    if storage == "float32":
+        # Nothing to gain from rescoring an index that is already exact
+        rescore_factor = 0
+
+    if rescore_factor and store.full_vectors is None:
+        if not store.index.ntotal:
+            store.full_vectors = FullPrecisionVectors(store.index.d)
+            changed = True
+        elif not full_precision:
+            logger.warning("Rescoring needs full-precision vectors, which a quantized index cannot provide; re-ingest to enable it")
+        else:
+            # Exact copies are only available while the index is still float32
+            ids = [store.index_to_docstore_id[i] for i in range(store.index.ntotal)]
+            store.full_vectors = FullPrecisionVectors(store.index.d)
+            store.full_vectors.add(ids, store.index.reconstruct_n(0, store.index.ntotal))
+            changed = True
+
+    if index_storage(store.index) != storage:
+        store.index = convert_index(store.index, storage)
+        changed = True
+
+    store.rescore_factor = rescore_factor if store.full_vectors is not None else 0
+    return changed
@@ -0,0 +1,57 @@
+import re
+from typing import List
+from langchain_core.documents import Document
+
+EXPANSION_MODES = ("off", "heuristic", "llm")
+
+# "compare X with Y", "X vs Y", "X compared to Y"
+_COMPARE = re.compile(r"^\s*(?:compare|contrast)\s+(?P<left>.+?)\s+(?:with|to|and|against)\s+(?P<right>.+)$", re.IGNORECASE)
+_VERSUS = re.compile(r"\s+(?:vs\.?|versus|compared (?:to|with)|as opposed to)\s+", re.IGNORECASE)
+# Separate questions or clauses in one message
+_CLAUSES = re.compile(r"(?<=\?)\s+|\s*[;\n]+\s*")
+_AND = re.compile(r",?\s+(?:and also|as well as|and)\s+", re.IGNORECASE)
+
+def _words(text: str) -> int:
+    return len(text.split())
+
+def split_query(query: str, max_sub_queries: int) -> List[str]:
+    """
+    Splits a compound question into sub-queries with local rules: separate
+    questions, comparisons ("compare X with Y", "X vs Y") and "and" between
+    two clauses of three or more words. Returns [] when nothing splits.
+    """
+    parts = []
+    for clause in _CLAUSES.split(query.strip()):
+        compare = _COMPARE.match(clause)
+        pieces = [compare["left"], compare["right"]] if compare else _VERSUS.split(clause)
+        for piece in pieces:
+            halves = _AND.split(piece)
+            # Short conjuncts ("terms and conditions") belong together
+            if len(halves) > 1 and all(_words(half) >= 3 for half in halves):
+                parts.extend(halves)
+            else:
+                parts.append(piece)
+    parts = [part.strip(" ,.?") for part in parts]
+    parts = list(dict.fromkeys(part for part in parts if part))
+    return parts[:max_sub_queries] if len(parts) > 1 else []
+
+def parse_sub_queries(text: str, max_sub_queries: int) -> List[str]:
+    """
+    Reads the LLM's one-query-per-line answer, dropping list markers.
+    """
+    lines = [re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line).strip() for line in text.splitlines()]
+    queries = list(dict.fromkeys(line for line in lines if line))
+    return queries[:max_sub_queries] if len(queries) > 1 else []
+
+def reciprocal_rank_fusion(ranked_lists: List[List[Document]], rrf_k: int = 60) -> List[Document]:
+    """
+    Merges ranked lists by reciprocal rank fusion: each document scores
+    sum(1 / (rrf_k + rank)) over the lists it appears in.
+    """
+    scores, documents = {}, {}
+    for ranked in ranked_lists:
+        for rank, doc in enumerate(ranked, start=1):
+            key = doc.id or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1 / (rrf_k + rank)
+            documents.setdefault(key, doc)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
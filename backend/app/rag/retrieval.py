@@ -0,0 +1,54 @@
+from typing import List, Optional
+from langchain_core.documents import Document
+from app.core.config import settings
+from app.core.metrics import stage_timer
+from app.rag.documents import search_kwargs
+from app.rag.parents import expand_to_parents, parent_retrieval_enabled
+from app.rag.query_expansion import reciprocal_rank_fusion
+from app.rag.vector_store import get_embeddings, index_manager
+
+def search_documents(query: str, k: Optional[int] = None, timeout: Optional[float] = None) -> List[Document]:
+    """
+    Returns the k chunks most similar to the query, excluding deleted documents.
+    This is the search path used by the retrieve node. `timeout` bounds the
+    wait for a query embedding.
+
+    With parent-document retrieval, PARENT_FETCH_K child chunks are searched
+    and expanded to at most k distinct parent sections within
+    PARENT_CONTEXT_TOKENS.
+    """
+    k = k or settings.RETRIEVAL_K
+    expand = parent_retrieval_enabled()
+    with stage_timer("chat", "embed_query"):
+        query_vector = get_embeddings().embed_query(query, timeout=timeout)
+    # Pin the current index generation so a concurrent ingest cannot swap it mid-search
+    with index_manager.reader() as vector_store, stage_timer("chat", "faiss_search"):
+        # Deleted documents stay in the index until compaction, so mask them here
+        docs = vector_store.similarity_search_by_vector(
+            query_vector, **search_kwargs(max(k, settings.PARENT_FETCH_K) if expand else k)
+        )
+    if not expand:
+        return docs
+    with stage_timer("chat", "parent_expand"):
+        return expand_to_parents(docs, k, settings.PARENT_CONTEXT_TOKENS)
+
+def search_many(queries: List[str], k: Optional[int] = None, timeout: Optional[float] = None) -> List[Document]:
+    """
+    Multi-query version of search_documents(): embeds all queries in one
+    batch, searches them with a single batched FAISS call and merges the
+    ranked lists by reciprocal rank fusion before taking the top k
+    (or expanding to parents). `timeout` bounds the wait for the embeddings.
+    """
+    k = k or settings.RETRIEVAL_K
+    expand = parent_retrieval_enabled()
+    fetch = max(k, settings.PARENT_FETCH_K) if expand else k
+    with stage_timer("chat", "embed_query"):
+        query_vectors = get_embeddings().embed_queries(queries, timeout=timeout)
+    with index_manager.reader() as vector_store, stage_timer("chat", "faiss_search"):
+        ranked_lists = vector_store.batch_similarity_search_by_vectors(query_vectors, **search_kwargs(fetch))
+    with stage_timer("chat", "rank_fusion"):
+        docs = reciprocal_rank_fusion(ranked_lists, settings.RRF_K)[:fetch]
+    if not expand:
+        return docs
+    with stage_timer("chat", "parent_expand"):
+        return expand_to_parents(docs, k, settings.PARENT_CONTEXT_TOKENS)
@@ -1,15 +1,44 @@
+import requests
+from typing import Optional
 from langchain_community.utilities import GoogleSerperAPIWrapper
 from langchain_core.tools import Tool
 from app.core.config import settings
 
-def get_search_tool():
+class SerperSearch(GoogleSerperAPIWrapper):
+    """
+    GoogleSerperAPIWrapper with a configurable endpoint, so searches can be
+    pointed at a local stand-in server for offline benchmarks.
+    """
+    base_url: str = "https://google.serper.dev"
+    timeout: Optional[float] = None
+
+    def _google_serper_api_results(self, search_term: str, search_type: str = "search", **kwargs) -> dict:
+        headers = {
+            "X-API-KEY": self.serper_api_key or "",
+            "Content-Type": "application/json",
+        }
+        params = {
+            "q": search_term,
+            **{key: value for key, value in kwargs.items() if value is not None},
+        }
+        response = requests.post(
+            f"{self.base_url}/{search_type}", headers=headers, params=params, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+def get_search_tool(timeout: Optional[float] = None):
     """
     Returns a Tool instance for Serper search.
     """
     if not settings.SERPER_API_KEY:
         raise ValueError("SERPER_API_KEY is not set in environment variables.")
 
-    search = GoogleSerperAPIWrapper(serper_api_key=settings.SERPER_API_KEY)
+    search = SerperSearch(
+        serper_api_key=settings.SERPER_API_KEY,
+        base_url=settings.SERPER_BASE_URL,
+        timeout=timeout if timeout is not None else settings.SEARCH_TIMEOUT,
+    )
     
     return Tool(
         name="web_search",
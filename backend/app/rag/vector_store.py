@@ -1,68 +1,80 @@
-import os
+import threading
 from functools import lru_cache
 from pathlib import Path
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from app.core.config import settings
+from app.rag.embeddings import EmbeddingEngine
+from app.rag.index_manager import IndexManager
+from app.rag.quantization import QuantizedFAISS, build_index, configure_store
 
-# Module-level cache for embeddings and vector store
+# Module-level cache for embeddings
 _embeddings_instance = None
-_vector_store_instance = None
+# Background warm-up and early requests may ask for the model at the same time
+_embeddings_lock = threading.Lock()
 
 @lru_cache(maxsize=1)
 def get_embeddings():
     """
-    Returns cached HuggingFace Embeddings instance.
+    Returns cached embedding engine instance.
     Using 'all-MiniLM-L6-v2' which is a good balance of speed and quality.
     """
     global _embeddings_instance
-    if _embeddings_instance is None:
-        _embeddings_instance = HuggingFaceEmbeddings(
-            model_name="all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
-        # Pre-warm the model
-        _embeddings_instance.embed_query("warmup")
+    with _embeddings_lock:
+        if _embeddings_instance is None:
+            _embeddings_instance = EmbeddingEngine(
+                model_name=settings.EMBEDDING_MODEL,
+                backend=settings.EMBEDDING_BACKEND,
+                batch_window_ms=settings.EMBEDDING_BATCH_WINDOW_MS,
+                max_batch_size=settings.EMBEDDING_MAX_BATCH,
+                batch_size=settings.EMBEDDING_BATCH_SIZE,
+                num_threads=settings.EMBEDDING_THREADS,
+            )
+            # Pre-warm the model
+            _embeddings_instance.warmup()
     return _embeddings_instance
 
-def get_vector_store():
-    """
-    Returns the FAISS vector store instance (cached).
-    Note: Returns new instance if documents were added via ingest.
-    """
-    global _vector_store_instance
-    embeddings = get_embeddings()
-    
-    vector_store_path = Path(settings.CHROMA_PERSIST_DIRECTORY) / "faiss_index"
-    
-    # Return cached instance if available and not invalidated
-    if vector_store_path.exists() and _vector_store_instance is not None:
-        try:
-            return _vector_store_instance
-        except Exception:
-            pass
-    
-    # Try to load existing vector store
-    if vector_store_path.exists():
-        try:
-            _vector_store_instance = FAISS.load_local(
-                str(vector_store_path),
-                embeddings,
-                allow_dangerous_deserialization=True
-            )
-            return _vector_store_instance
-        except Exception:
-            # If loading fails, create a new one
-            pass
-    
+def _load_index(path: Path):
+    import faiss
+    # A memory-mapped index is a read-only view backed by the page cache, so
+    # every worker process shares one copy; writers always work on a copy.
+    io_flags = faiss.IO_FLAG_MMAP_IFC if settings.VECTOR_INDEX_MMAP else 0
+    vector_store = QuantizedFAISS.load_local(
+        str(path),
+        get_embeddings(),
+        allow_dangerous_deserialization=True,
+        io_flags=io_flags,
+    )
+    # Convert indexes saved with a different VECTOR_STORAGE once, on load
+    if configure_store(vector_store, settings.VECTOR_STORAGE, settings.VECTOR_RESCORE_FACTOR):
+        index_manager.save(vector_store)
+    return vector_store
+
+def _create_index():
     # Create new empty vector store with a dummy document
+    from langchain_community.docstore.in_memory import InMemoryDocstore
     from langchain_core.documents import Document
+    embeddings = get_embeddings()
     dummy_doc = Document(page_content="Initialization document", metadata={"source": "init"})
-    _vector_store_instance = FAISS.from_documents([dummy_doc], embeddings)
-    
-    # Save it
-    os.makedirs(vector_store_path.parent, exist_ok=True)
-    _vector_store_instance.save_local(str(vector_store_path))
-    
-    return _vector_store_instance
+    dummy_vector = embeddings.embed_documents([dummy_doc.page_content])[0]
+    vector_store = QuantizedFAISS(
+        embeddings,
+        build_index(len(dummy_vector), settings.VECTOR_STORAGE),
+        InMemoryDocstore(),
+        {},
+    )
+    configure_store(vector_store, settings.VECTOR_STORAGE, settings.VECTOR_RESCORE_FACTOR)
+    vector_store.add_embeddings([(dummy_doc.page_content, dummy_vector)], metadatas=[dummy_doc.metadata])
+    return vector_store
+
+index_manager = IndexManager(
+    Path(settings.CHROMA_PERSIST_DIRECTORY) / "faiss_index",
+    load_fn=_load_index,
+    create_fn=_create_index,
+    refresh_seconds=settings.INDEX_REFRESH_SECONDS,
+)
+
+def get_vector_store():
+    """
+    Returns the FAISS vector store of the current index generation.
+    Use index_manager.reader() instead to pin the generation for a whole search.
+    """
+    return index_manager.current().store
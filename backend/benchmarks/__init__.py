@@ -0,0 +1 @@
+"""Benchmark Scripts Package"""
\ No newline at end of file
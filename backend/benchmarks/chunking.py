@@ -0,0 +1,102 @@
+"""
+Chunking strategy benchmark.
+
+For each strategy reports chunks per document, tokens sent to the embedding
+model (overlap included), index size, and hit@k / MRR on the labelled
+questions of the synthetic corpus (a hit is a retrieved chunk containing the
+answer sentence).
+
+Usage (from backend/):
+    python -m benchmarks.chunking --docs 30 --k 3
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+
+def candidate_configs():
+    from app.rag.chunking import ChunkingConfig
+
+    return {
+        "legacy recursive 1000/200 chars": ChunkingConfig(strategy="recursive", chunk_size=1000, chunk_overlap=200, unit="chars"),
+        "recursive 256/20 tokens": ChunkingConfig(strategy="recursive", chunk_size=256, chunk_overlap=20),
+        "markdown 256/20 tokens": ChunkingConfig(strategy="markdown", chunk_size=256, chunk_overlap=20),
+        "markdown 256/0 tokens": ChunkingConfig(strategy="markdown", chunk_size=256, chunk_overlap=0),
+        "markdown 128/0 tokens": ChunkingConfig(strategy="markdown", chunk_size=128, chunk_overlap=0),
+    }
+
+def load_corpus(corpus_dir: Path):
+    import json
+    from langchain_core.documents import Document
+
+    documents = {
+        path.name: Document(page_content=path.read_text(), metadata={"source": path.name})
+        for path in sorted(corpus_dir.glob("*.md"))
+    }
+    with open(corpus_dir / "questions.jsonl") as f:
+        questions = [json.loads(line) for line in f]
+    return documents, questions
+
+def evaluate(name, config, documents, questions, embeddings, k):
+    import faiss
+    from app.rag.chunking import _token_counter, split_documents
+
+    count_tokens = _token_counter("cl100k_base")
+    chunks = []
+    for document in documents.values():
+        chunks += split_documents([document], ".md", config)
+    texts = [chunk.page_content for chunk in chunks]
+
+    start = time.perf_counter()
+    vectors = np.array(embeddings.embed_documents(texts), dtype=np.float32)
+    embed_s = time.perf_counter() - start
+
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    query_vectors = np.array(embeddings.embed_documents([q["question"] for q in questions]), dtype=np.float32)
+    _, found = index.search(query_vectors, k)
+
+    hits, reciprocal_ranks = 0, 0.0
+    for question, rows in zip(questions, found):
+        for rank, row in enumerate(rows, start=1):
+            if question["answer"] in texts[row]:
+                hits += 1
+                reciprocal_ranks += 1 / rank
+                break
+
+    return {
+        "name": name,
+        "chunks_per_doc": len(chunks) / len(documents),
+        "embedded_tokens": sum(count_tokens(text) for text in texts),
+        "index_kb": index.ntotal * index.d * 4 / 1024,
+        "embed_s": embed_s,
+        "hit_at_k": hits / len(questions),
+        "mrr": reciprocal_ranks / len(questions),
+    }
+
+def main():
+    from benchmarks.corpus import generate_corpus
+    from app.rag.vector_store import get_embeddings
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Directory written by benchmarks.corpus (generated if omitted)")
+    parser.add_argument("--docs", type=int, default=30)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus_dir = Path(args.corpus) if args.corpus else generate_corpus(Path(tempfile.mkdtemp()), args.docs)
+    documents, questions = load_corpus(corpus_dir)
+    embeddings = get_embeddings()
+
+    print(f"{'strategy':34} {'chunks/doc':>10} {'tokens':>8} {'index KB':>9} {'embed s':>8} {'hit@k':>6} {'MRR':>6}")
+    for name, config in candidate_configs().items():
+        r = evaluate(name, config, documents, questions, embeddings, args.k)
+        print(
+            f"{r['name']:34} {r['chunks_per_doc']:10.1f} {r['embedded_tokens']:8d} {r['index_kb']:9.1f} "
+            f"{r['embed_s']:8.2f} {r['hit_at_k']:6.3f} {r['mrr']:6.3f}"
+        )
+
+if __name__ == "__main__":
+    main()
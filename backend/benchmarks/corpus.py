@@ -0,0 +1,90 @@
+"""
+Synthetic corpus generator.
+
+Documents are markdown with headed sections of filler prose. Every section
+hides one unique fact ("The access code for Project X is Y.") with a matching
+question, so retrieval quality can be scored without hand labelling.
+
+Usage (from backend/):
+    python -m benchmarks.corpus --docs 50 --out /tmp/corpus
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+
+WORDS = (
+    "the report describes quarterly revenue growth across regions while the "
+    "committee reviewed pricing policy contract terms customer retention risk "
+    "analysis and market outlook for the coming fiscal year including supply "
+    "chain constraints staffing plans product roadmap and compliance updates"
+).split()
+
+SUBJECTS = ["Project", "Team", "Region", "Product", "Vendor", "Contract", "Policy", "Office"]
+NAMES = ["Atlas", "Borealis", "Cobalt", "Delta", "Ember", "Falcon", "Granite", "Harbor", "Indigo", "Juniper"]
+ATTRIBUTES = ["access code", "budget owner", "launch city", "audit month", "review board", "backup site"]
+VALUES = ["Lisbon", "Osaka", "Quito", "Nairobi", "Tromso", "Perth", "Calgary", "Porto", "Accra", "Hanoi",
+          "March", "October", "KX-41", "ZR-09", "Morgan", "Patel", "Okafor", "Larsen"]
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 20))]
+    return " ".join(words).capitalize() + "."
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(_sentence(rng) for _ in range(rng.randint(3, 7)))
+
+def generate_document(index: int, sections: int = 6, seed: int = 0):
+    """
+    Returns (markdown_text, questions) for one synthetic document.
+    Each question is {"question", "answer", "doc", "section"}.
+    """
+    rng = random.Random(seed * 100003 + index)
+    title = f"Document {index}: {rng.choice(SUBJECTS)} {rng.choice(NAMES)} briefing"
+    parts = [f"# {title}", "", _paragraph(rng), ""]
+    questions = []
+    for section in range(sections):
+        entity = f"{rng.choice(SUBJECTS)} {rng.choice(NAMES)}-{index}-{section}"
+        attribute = rng.choice(ATTRIBUTES)
+        value = rng.choice(VALUES)
+        paragraphs = [_paragraph(rng) for _ in range(rng.randint(2, 4))]
+        fact = f"The {attribute} for {entity} is {value}."
+        at = rng.randrange(len(paragraphs))
+        paragraphs[at] = f"{paragraphs[at]} {fact}"
+        parts += [f"## Section {section + 1}: {entity}", ""]
+        for paragraph in paragraphs:
+            parts += [paragraph, ""]
+        questions.append({
+            "question": f"What is the {attribute} for {entity}?",
+            "answer": fact,
+            "doc": f"doc_{index:04d}.md",
+            "section": section,
+        })
+    return "\n".join(parts), questions
+
+def generate_corpus(out_dir: Path, docs: int, sections: int = 6, seed: int = 0):
+    """
+    Writes doc_NNNN.md files and a questions.jsonl label file into out_dir.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with open(out_dir / "questions.jsonl", "w") as f:
+        for index in range(docs):
+            text, questions = generate_document(index, sections, seed)
+            (out_dir / f"doc_{index:04d}.md").write_text(text)
+            for question in questions:
+                f.write(json.dumps(question) + "\n")
+    return out_dir
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=50)
+    parser.add_argument("--sections", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="benchmarks/data/corpus")
+    args = parser.parse_args()
+    out_dir = generate_corpus(Path(args.out), args.docs, args.sections, args.seed)
+    print(f"Wrote {args.docs} documents to {out_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Embedding throughput and latency benchmark.
+
+Compares the previous path (HuggingFaceEmbeddings, one forward pass per
+query) with EmbeddingEngine for each backend.
+
+Usage (from backend/):
+    python -m benchmarks.embeddings --concurrency 16 --queries 512
+"""
+
+import argparse
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+WORDS = (
+    "document summary revenue pricing section policy report analysis market "
+    "customer contract quarterly growth risk model data retrieval agent"
+).split()
+
+def synthetic_texts(count: int, min_words: int, max_words: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words)))
+        for _ in range(count)
+    ]
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def bench_queries(embeddings, queries, concurrency):
+    latencies = []
+
+    def timed(query):
+        start = time.perf_counter()
+        embeddings.embed_query(query)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, queries))
+    elapsed = time.perf_counter() - start
+    return {
+        "qps": len(queries) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+def bench_documents(embeddings, chunks):
+    start = time.perf_counter()
+    embeddings.embed_documents(chunks)
+    elapsed = time.perf_counter() - start
+    return {"chunks_per_s": len(chunks) / elapsed}
+
+def build_candidates(model_name, backends, window_ms):
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    from app.rag.embeddings import EmbeddingEngine
+
+    yield "baseline (HuggingFaceEmbeddings)", HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+    for backend in backends:
+        try:
+            engine = EmbeddingEngine(model_name=model_name, backend=backend, batch_window_ms=window_ms)
+        except ValueError as e:
+            print(f"Skipping {backend}: {e}")
+            continue
+        yield f"engine ({backend}, window {window_ms}ms)", engine
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--backends", default="torch,int8,onnx")
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--queries", type=int, default=512)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--chunks", type=int, default=1024)
+    args = parser.parse_args()
+
+    queries = synthetic_texts(args.queries, 4, 20, seed=1)
+    chunks = synthetic_texts(args.chunks, 20, 200, seed=2)
+
+    print(f"{'candidate':45} {'qps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'chunks/s':>9}")
+    for name, embeddings in build_candidates(args.model, args.backends.split(","), args.window_ms):
+        embeddings.embed_documents(queries[:8])  # warm up
+        query_stats = bench_queries(embeddings, queries, args.concurrency)
+        doc_stats = bench_documents(embeddings, chunks)
+        print(
+            f"{name:45} {query_stats['qps']:8.1f} {query_stats['p50_ms']:8.1f} "
+            f"{query_stats['p95_ms']:8.1f} {query_stats['p99_ms']:8.1f} {doc_stats['chunks_per_s']:9.1f}"
+        )
+
+if __name__ == "__main__":
+    main()
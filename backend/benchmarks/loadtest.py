@@ -0,0 +1,260 @@
+"""
+Offline load test for /api/chat and /api/upload.
+
+Drives the API with concurrent clients and reports RPS, p50/p95/p99 latency,
+errors and the per-node / per-stage time breakdown scraped from /metrics.
+With --offline it starts the stub LLM, stub Serper and the API itself
+(against a throwaway index), so no OpenRouter or Serper keys are needed.
+
+Usage (from backend/):
+    python -m benchmarks.loadtest --offline --scenario chat --concurrency 16 --duration 30
+    python -m benchmarks.loadtest --offline --scenario mixed --save-baseline benchmarks/baseline.json
+    python -m benchmarks.loadtest --offline --scenario mixed --compare benchmarks/baseline.json
+
+Scenarios:
+    chat    questions from the synthetic corpus against /api/chat
+    upload  synthetic documents against /api/upload
+    mixed   chat traffic with one uploader running alongside
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def wait_for(url: str, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+def start_offline_stack(args, workdir: Path):
+    """
+    Starts the stub upstreams and the API pointed at them.
+    Returns the list of processes to stop afterwards.
+    """
+    python = sys.executable
+    llm_port, serper_port = args.port + 1001, args.port + 1002
+    processes = [
+        subprocess.Popen([
+            python, "-m", "benchmarks.stub_llm", "--port", str(llm_port),
+            "--latency-ms", str(args.llm_latency_ms), "--tokens-per-s", str(args.tokens_per_s),
+            "--error-rate", str(args.llm_error_rate),
+        ], cwd=BACKEND_DIR),
+        subprocess.Popen([
+            python, "-m", "benchmarks.stub_serper", "--port", str(serper_port),
+            "--latency-ms", str(args.search_latency_ms),
+        ], cwd=BACKEND_DIR),
+    ]
+    env = {
+        **os.environ,
+        "OPENROUTER_API_KEY": "stub",
+        "OPENROUTER_MODEL": "stub",
+        "OPENROUTER_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+        "SERPER_API_KEY": "stub",
+        "SERPER_BASE_URL": f"http://127.0.0.1:{serper_port}",
+        "CHROMA_PERSIST_DIRECTORY": str(workdir / "index"),
+        "CHAT_RATE_LIMIT": "100000/minute",
+    }
+    processes.append(subprocess.Popen([
+        python, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(args.port),
+        "--log-level", "warning",
+    ], cwd=BACKEND_DIR, env=env))
+    wait_for(f"http://127.0.0.1:{llm_port}/v1/models")
+    wait_for(f"http://127.0.0.1:{args.port}/ready")
+    return processes
+
+def scrape_metrics(client: httpx.Client, api: str) -> dict:
+    """
+    Returns {(metric, labels): value} for the latency sums and counts.
+    """
+    from prometheus_client.parser import text_string_to_metric_families
+
+    snapshot = {}
+    text = client.get(f"{api}/metrics").text
+    for family in text_string_to_metric_families(text):
+        for sample in family.samples:
+            if sample.name.endswith(("_sum", "_count")) and "latency" in sample.name:
+                labels = ",".join(f"{k}={v}" for k, v in sorted(sample.labels.items()))
+                snapshot[(sample.name, labels)] = sample.value
+    return snapshot
+
+def breakdown(before: dict, after: dict) -> dict:
+    """
+    Mean seconds per call for each node/stage during the run.
+    """
+    result = {}
+    for (name, labels), value in after.items():
+        if not name.endswith("_sum"):
+            continue
+        count_key = (name[:-4] + "_count", labels)
+        calls = after.get(count_key, 0) - before.get(count_key, 0)
+        if calls > 0:
+            total = value - before.get((name, labels), 0)
+            result[f"{name[:-4].replace('rag_', '')}{{{labels}}}"] = {"calls": int(calls), "mean_ms": total / calls * 1000}
+    return result
+
+async def run_clients(api, scenario, corpus_dir, concurrency, duration, requests_limit, timeout):
+    from benchmarks.corpus import generate_corpus
+
+    corpus_dir = Path(corpus_dir) if corpus_dir else generate_corpus(Path(tempfile.mkdtemp()), 20)
+    questions = [json.loads(line)["question"] for line in open(corpus_dir / "questions.jsonl")]
+    documents = sorted(corpus_dir.glob("*.md"))
+    results = {"chat": [], "upload": []}
+    errors = {}
+    stop_at = time.monotonic() + duration
+    issued = 0
+
+    async def one(client, kind, rng):
+        start = time.perf_counter()
+        try:
+            if kind == "chat":
+                response = await client.post(f"{api}/api/chat", json={
+                    "message": rng.choice(questions), "session_id": f"load-{rng.randrange(1_000_000)}",
+                })
+            else:
+                path = rng.choice(documents)
+                response = await client.post(f"{api}/api/upload", files={"file": (path.name, path.read_bytes())})
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - start
+        if status == 200:
+            results[kind].append(elapsed)
+        else:
+            errors[f"{kind}:{status}"] = errors.get(f"{kind}:{status}", 0) + 1
+
+    async def worker(worker_id, kind):
+        nonlocal issued
+        rng = random.Random(worker_id)
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            while time.monotonic() < stop_at and (not requests_limit or issued < requests_limit):
+                issued += 1
+                await one(client, kind, rng)
+
+    if scenario == "chat":
+        kinds = ["chat"] * concurrency
+    elif scenario == "upload":
+        kinds = ["upload"] * concurrency
+    else:
+        kinds = ["chat"] * max(concurrency - 1, 1) + ["upload"]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i, kind) for i, kind in enumerate(kinds)))
+    wall = time.perf_counter() - start
+
+    report = {"scenario": scenario, "concurrency": concurrency, "wall_s": wall, "errors": errors}
+    for kind, latencies in results.items():
+        if latencies:
+            report[kind] = {
+                "requests": len(latencies),
+                "rps": len(latencies) / wall,
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+            }
+    return report
+
+def print_report(report: dict):
+    print(f"\nScenario {report['scenario']} @ concurrency {report['concurrency']} ({report['wall_s']:.1f}s)")
+    for kind in ("chat", "upload"):
+        if kind in report:
+            r = report[kind]
+            print(
+                f"  {kind:7} {r['requests']:6d} ok  {r['rps']:7.2f} rps  "
+                f"p50 {r['p50_ms']:8.1f}  p95 {r['p95_ms']:8.1f}  p99 {r['p99_ms']:8.1f} ms"
+            )
+    if report["errors"]:
+        print(f"  errors: {report['errors']}")
+    if report.get("breakdown"):
+        print("  per-node / per-stage mean latency:")
+        for name, r in sorted(report["breakdown"].items()):
+            print(f"    {name:60} {r['calls']:6d} calls {r['mean_ms']:9.1f} ms")
+
+def compare(report: dict, baseline: dict, tolerance: float) -> bool:
+    """
+    Prints deltas against a saved baseline. Returns False on a regression
+    beyond tolerance (relative) in RPS or tail latency.
+    """
+    ok = True
+    print(f"\nCompared with baseline (tolerance {tolerance:.0%}):")
+    for kind in ("chat", "upload"):
+        if kind not in report or kind not in baseline:
+            continue
+        for metric, higher_is_better in (("rps", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False)):
+            old, new = baseline[kind][metric], report[kind][metric]
+            change = (new - old) / old if old else 0.0
+            regressed = change < -tolerance if higher_is_better else change > tolerance
+            ok = ok and not regressed
+            flag = "REGRESSION" if regressed else ""
+            print(f"  {kind:7} {metric:7} {old:9.1f} -> {new:9.1f} ({change:+.1%}) {flag}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api", help="Base URL of a running API (default: the one started by --offline)")
+    parser.add_argument("--offline", action="store_true", help="Start stub upstreams and the API locally")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--scenario", choices=["chat", "upload", "mixed"], default="chat")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests (0 = run for --duration)")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--corpus", help="Directory written by benchmarks.corpus (generated if omitted)")
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--tokens-per-s", type=float, default=0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--search-latency-ms", type=float, default=250)
+    parser.add_argument("--save-baseline", help="Write the report as JSON")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    processes = []
+    api = args.api or f"http://127.0.0.1:{args.port}"
+    try:
+        if args.offline:
+            processes = start_offline_stack(args, Path(tempfile.mkdtemp(prefix="rag-loadtest-")))
+        with httpx.Client(timeout=30) as client:
+            before = scrape_metrics(client, api)
+            report = asyncio.run(run_clients(
+                api, args.scenario, args.corpus, args.concurrency, args.duration, args.requests, args.timeout
+            ))
+            report["breakdown"] = breakdown(before, scrape_metrics(client, api))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+    print_report(report)
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2))
+        print(f"\nSaved baseline to {args.save_baseline}")
+    if args.compare:
+        if not compare(report, json.loads(Path(args.compare).read_text()), args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Recall and memory report for quantized vector storage.
+
+Compares float32, float16 and int8 storage (with and without full-precision
+rescoring) against exact float32 search. Uses the vectors of the saved index
+when it is large enough, otherwise synthetic clustered unit vectors.
+
+Rescoring needs a float32 copy of every vector (full_vectors.npy) besides
+the quantized index. It is reported separately ("rescore MB") and included
+in "total MB": int8 + rescoring stores more than float32 alone. The copy is
+memory-mapped, so only the rows rescoring touches are paged in, but its disk
+footprint is the full float32 size.
+
+Usage (from backend/):
+    python -m benchmarks.quantization --queries 200 --k 3
+    python -m benchmarks.quantization --synthetic 100000
+"""
+
+import argparse
+import time
+import numpy as np
+
+def synthetic_vectors(count: int, dim: int, seed: int = 0):
+    # Clustered unit vectors resemble sentence embeddings better than uniform noise
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(count // 50, 1), dim))
+    vectors = centers[rng.integers(0, len(centers), count)] + 0.5 * rng.normal(size=(count, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+def saved_vectors():
+    from pathlib import Path
+    import faiss
+    from app.core.config import settings
+
+    path = Path(settings.CHROMA_PERSIST_DIRECTORY) / "faiss_index" / "index.faiss"
+    if not path.exists():
+        return None
+    index = faiss.read_index(str(path))
+    return index.reconstruct_n(0, index.ntotal)
+
+def recall_at_k(found, truth, k):
+    hits = sum(len(set(f[:k]) & set(t[:k])) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+def main():
+    import faiss
+    from app.rag.quantization import build_index, bytes_per_vector
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead of the saved index")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    args = parser.parse_args()
+
+    vectors = None if args.synthetic else saved_vectors()
+    if vectors is None or len(vectors) < 1000:
+        vectors = synthetic_vectors(args.synthetic or 50000, args.dim)
+        print(f"Using {len(vectors)} synthetic vectors")
+    else:
+        print(f"Using {len(vectors)} vectors from the saved index")
+
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    exact = build_index(vectors.shape[1], "float32")
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+
+    print(f"{'storage':22} {'bytes/vec':>9} {'index MB':>9} {'rescore MB':>10} {'total MB':>9} {'recall@k':>9} {'ms/query':>9}")
+    for storage in ("float32", "float16", "int8"):
+        index = build_index(vectors.shape[1], storage)
+        index.add(vectors)
+        size_mb = len(faiss.serialize_index(index)) / 1e6
+        # The float32 copy full_vectors.npy keeps for rescoring
+        rescore_mb = vectors.astype(np.float32).nbytes / 1e6
+        modes = [0] if storage == "float32" else [0, args.rescore_factor]
+        for factor in modes:
+            start = time.perf_counter()
+            if factor:
+                _, candidates = index.search(queries, args.k * factor)
+                found = []
+                for query, row in zip(queries, candidates):
+                    distances = ((vectors[row] - query) ** 2).sum(axis=1)
+                    found.append(row[np.argsort(distances)[:args.k]])
+            else:
+                _, found = index.search(queries, args.k)
+            elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+            name = storage + (f" + rescore x{factor}" if factor else "")
+            extra_mb = rescore_mb if factor else 0.0
+            print(
+                f"{name:22} {bytes_per_vector(index):9d} {size_mb:9.1f} {extra_mb:10.1f} {size_mb + extra_mb:9.1f} "
+                f"{recall_at_k(found, truth, args.k):9.3f} {elapsed_ms:9.3f}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Retrieval quality vs latency evaluation.
+
+Builds one index per chunking x storage configuration through the real
+ingestion path, then runs every labelled question through search_documents()
+(the search behind graph.retrieve) for each k and rescore factor. Reports
+recall@k, MRR and nDCG@k next to query latency and index memory. The float32
+copy kept for rescoring is reported on its own ("resc MB": full_vectors.npy,
+plus any vectors not yet saved, which are held in RAM).
+
+Runs offline with the locally cached embedding model; no LLM is called.
+
+Labelled sets are JSONL, one question per line:
+    {"question": "...", "relevant_text": ["sentence found in the right chunk"]}
+    {"question": "...", "answer": "sentence found in the right chunk"}
+A chunk is relevant when it contains one of the strings. The synthetic corpus
+from benchmarks.corpus is used when --corpus is omitted.
+
+Usage (from backend/):
+    python -m benchmarks.retrieval_eval --k 1,3,5,10 \\
+        --chunking recursive:1000:200:chars,markdown:256:20:tokens \\
+        --storage float32,int8 --rescore 0,4
+
+Parent-document retrieval is evaluated with a parent size as fifth field,
+e.g. markdown:64:0:tokens:512 (64-token children expanded to 512-token parents).
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+# Never reach out to the network: the embedding model must already be cached
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("OPENROUTER_API_KEY", "offline-eval")
+
+def parse_chunking(spec: str) -> dict:
+    fields = spec.split(":")
+    strategy, size, overlap = fields[:3]
+    unit = fields[3] if len(fields) > 3 else "tokens"
+    # A fifth field indexes children of that size and expands hits to parents
+    parent = int(fields[4]) if len(fields) > 4 else None
+    return {"strategy": strategy, "chunk_size": int(size), "chunk_overlap": int(overlap), "unit": unit,
+            "parent_chunk_size": parent}
+
+def load_labels(path: Path) -> list:
+    labels = []
+    with open(path) as f:
+        for line in f:
+            item = json.loads(line)
+            relevant = item.get("relevant_text") or [item["answer"]]
+            labels.append({"question": item["question"], "relevant": relevant})
+    return labels
+
+def is_relevant(doc, relevant) -> bool:
+    return any(text in doc.page_content for text in relevant)
+
+def score(ranked_docs, relevant, k, relevant_in_index) -> dict:
+    """
+    Binary relevance metrics for one question.
+    recall@k counts the question as answered if any relevant chunk is in
+    the top k, so answers duplicated by chunk overlap are not double counted.
+    nDCG@k is normalized by the relevant chunks that exist in the index.
+    """
+    flags = [is_relevant(doc, relevant) for doc in ranked_docs[:k]]
+    first = next((i for i, flag in enumerate(flags) if flag), None)
+    dcg = sum(1 / math.log2(i + 2) for i, flag in enumerate(flags) if flag)
+    ideal = sum(1 / math.log2(i + 2) for i in range(min(relevant_in_index, k)))
+    return {
+        "recall": 1.0 if first is not None else 0.0,
+        "mrr": 1 / (first + 1) if first is not None else 0.0,
+        "ndcg": dcg / ideal if ideal else 0.0,
+    }
+
+def index_memory_bytes(vector_store) -> dict:
+    """
+    Bytes of the FAISS index plus chunk texts ("index"), and of the float32
+    rescoring copy: saved to full_vectors.npy and memory-mapped ("rescore_disk",
+    resident only as far as rescoring pages it in) and not yet saved, in RAM
+    ("rescore_pending").
+    """
+    import faiss
+
+    text_bytes = sum(len(doc.page_content.encode("utf-8")) for doc in vector_store.docstore._dict.values())
+    full_vectors = getattr(vector_store, "full_vectors", None)
+    return {
+        "index": len(faiss.serialize_index(vector_store.index)) + text_bytes,
+        "rescore_disk": full_vectors.saved_bytes() if full_vectors is not None else 0,
+        "rescore_pending": full_vectors.pending_bytes() if full_vectors is not None else 0,
+    }
+
+def build_index(corpus_files, chunking: dict, storage: str, rescore: int, workdir: Path):
+    from fastapi import UploadFile
+    from app.core.config import settings
+    from app.rag.ingest import ingest_document
+    from app.rag.vector_store import index_manager
+
+    settings.CHUNKING_COLLECTIONS = {**settings.CHUNKING_COLLECTIONS, "eval": chunking}
+    settings.VECTOR_STORAGE = storage
+    settings.VECTOR_RESCORE_FACTOR = rescore
+    settings.CHROMA_PERSIST_DIRECTORY = str(workdir)
+    index_manager.reset(workdir / "faiss_index")
+
+    start = time.perf_counter()
+    for path in corpus_files:
+        ingest_document(UploadFile(file=io.BytesIO(path.read_bytes()), filename=path.name), collection="eval")
+    return time.perf_counter() - start
+
+def evaluate(labels, ks, rescore_factor):
+    from langchain_core.messages import HumanMessage
+    from app.agent.graph import retrieve
+    from app.rag.retrieval import search_documents
+    from app.rag.vector_store import get_vector_store
+
+    vector_store = get_vector_store()
+    vector_store.rescore_factor = rescore_factor
+    chunks = list(vector_store.docstore._dict.values())
+    relevant_counts = [sum(is_relevant(chunk, label["relevant"]) for chunk in chunks) for label in labels]
+    rows = []
+    for k in ks:
+        totals = {"recall": 0.0, "mrr": 0.0, "ndcg": 0.0}
+        search_latencies, node_latencies = [], []
+        for label, relevant_in_index in zip(labels, relevant_counts):
+            start = time.perf_counter()
+            docs = search_documents(label["question"], k=k)
+            search_latencies.append(time.perf_counter() - start)
+            for name, value in score(docs, label["relevant"], k, relevant_in_index).items():
+                totals[name] += value
+
+        # End-to-end node latency at the configured RETRIEVAL_K
+        for label in labels[:50]:
+            start = time.perf_counter()
+            retrieve({"messages": [HumanMessage(content=label["question"])]})
+            node_latencies.append(time.perf_counter() - start)
+
+        rows.append({
+            "k": k,
+            **{name: value / len(labels) for name, value in totals.items()},
+            "search_p50_ms": statistics.median(search_latencies) * 1000,
+            "search_p95_ms": sorted(search_latencies)[int(0.95 * (len(search_latencies) - 1))] * 1000,
+            "retrieve_p50_ms": statistics.median(node_latencies) * 1000,
+        })
+    return rows
+
+def main():
+    from benchmarks.corpus import generate_corpus
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Directory of .md/.txt/.pdf documents (synthetic corpus if omitted)")
+    parser.add_argument("--labels", help="Labelled JSONL (defaults to <corpus>/questions.jsonl)")
+    parser.add_argument("--docs", type=int, default=30, help="Synthetic corpus size")
+    parser.add_argument("--k", default="1,3,5,10")
+    parser.add_argument("--chunking", default="recursive:1000:200:chars,markdown:256:20:tokens")
+    parser.add_argument("--storage", default="float32,int8")
+    parser.add_argument("--rescore", default="0,4")
+    parser.add_argument("--output", help="Write all result rows as JSON")
+    args = parser.parse_args()
+
+    corpus_dir = Path(args.corpus) if args.corpus else generate_corpus(Path(tempfile.mkdtemp()), args.docs)
+    labels = load_labels(Path(args.labels) if args.labels else corpus_dir / "questions.jsonl")
+    corpus_files = sorted(p for p in corpus_dir.iterdir() if p.suffix.lower() in (".md", ".txt", ".pdf"))
+    ks = [int(k) for k in args.k.split(",")]
+    rescores = [int(r) for r in args.rescore.split(",")]
+
+    results = []
+    print(f"{'chunking':32} {'storage':8} {'resc':>4} {'k':>3} {'recall':>7} {'MRR':>6} {'nDCG':>6} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'node ms':>8} {'index MB':>9} {'resc MB':>8} {'pend MB':>8}")
+    for chunking_spec in args.chunking.split(","):
+        for storage in args.storage.split(","):
+            workdir = Path(tempfile.mkdtemp(prefix="rag-eval-"))
+            build_s = build_index(corpus_files, parse_chunking(chunking_spec), storage, max(rescores), workdir)
+            from app.rag.vector_store import get_vector_store
+            memory = index_memory_bytes(get_vector_store())
+            memory_mb = memory["index"] / 1e6
+            rescore_mb = memory["rescore_disk"] / 1e6
+            pending_mb = memory["rescore_pending"] / 1e6
+            for rescore in (rescores if storage != "float32" else [0]):
+                for row in evaluate(labels, ks, rescore):
+                    row.update({"chunking": chunking_spec, "storage": storage, "rescore": rescore,
+                                "index_mb": memory_mb, "rescore_disk_mb": rescore_mb,
+                                "rescore_pending_mb": pending_mb, "build_s": build_s})
+                    results.append(row)
+                    print(
+                        f"{chunking_spec:32} {storage:8} {rescore:4d} {row['k']:3d} {row['recall']:7.3f} "
+                        f"{row['mrr']:6.3f} {row['ndcg']:6.3f} {row['search_p50_ms']:7.2f} "
+                        f"{row['search_p95_ms']:7.2f} {row['retrieve_p50_ms']:8.2f} {memory_mb:9.2f} "
+                        f"{rescore_mb:8.2f} {pending_mb:8.2f}"
+                    )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Cold-start profile for the API.
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter and
+reports the slowest modules and top-level packages, then (unless
+--imports-only) starts uvicorn and measures the time until the port answers
+/health (liveness) and /ready (model, index and agent loaded).
+
+Usage (from backend/):
+    python -m benchmarks.startup
+    python -m benchmarks.startup --imports-only --top 30
+    python -m benchmarks.startup --module app.agent.graph --imports-only
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+def stub_env(workdir: Path) -> dict:
+    # Settings need an API key to import; startup never calls the LLM
+    return {
+        **os.environ,
+        "OPENROUTER_API_KEY": os.getenv("OPENROUTER_API_KEY", "stub"),
+        "CHROMA_PERSIST_DIRECTORY": os.getenv("CHROMA_PERSIST_DIRECTORY", str(workdir / "index")),
+    }
+
+def profile_imports(module: str, env: dict) -> list:
+    """
+    Returns [(module, self_us, cumulative_us)] parsed from -X importtime.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def print_import_report(rows: list, module: str, top: int):
+    total = next((cumulative for name, _, cumulative in rows if name == module), 0)
+    print(f"\nimport {module}: {total / 1e6:.3f}s ({len(rows)} modules)")
+
+    print("  slowest modules by cumulative time:")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: row[2], reverse=True)[:top]:
+        print(f"    {name:55} {cumulative_us / 1000:9.1f} ms  (self {self_us / 1000:7.1f} ms)")
+
+    # Self time summed per top-level package shows which dependency costs most
+    packages = {}
+    for name, self_us, _ in rows:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    print("  self time by top-level package:")
+    for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"    {package:55} {self_us / 1000:9.1f} ms  ({self_us / max(total, 1):5.1%})")
+
+def wait_until(url: str, start: float, timeout: float) -> float:
+    """
+    Seconds from `start` until `url` answers 200.
+    """
+    while time.perf_counter() - start < timeout:
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError(f"{url} did not answer within {timeout}s")
+
+def measure_server(port: int, env: dict, timeout: float) -> dict:
+    start = time.perf_counter()
+    server = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+        "--log-level", "warning",
+    ], cwd=BACKEND_DIR, env=env)
+    try:
+        health = wait_until(f"http://127.0.0.1:{port}/health", start, timeout)
+        ready = wait_until(f"http://127.0.0.1:{port}/ready", start, timeout)
+        phases = httpx.get(f"http://127.0.0.1:{port}/ready", timeout=2).json().get("phases", {})
+    finally:
+        server.terminate()
+        server.wait()
+    return {"health_s": health, "ready_s": ready, "phases": phases}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main", help="module to profile the import of")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--imports-only", action="store_true", help="skip starting the server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    env = stub_env(Path(tempfile.mkdtemp()))
+    print_import_report(profile_imports(args.module, env), args.module, args.top)
+
+    if not args.imports_only:
+        result = measure_server(args.port, env, args.timeout)
+        print("\nuvicorn app.main:app")
+        print(f"  /health answered after {result['health_s']:.2f}s")
+        print(f"  /ready answered after  {result['ready_s']:.2f}s")
+        for phase, seconds in result["phases"].items():
+            print(f"    {phase:12} {seconds:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Stand-in for the OpenAI-compatible chat completions API (OpenRouter).
+
+Routing prompts get "retrieve" or "web_search" (a fixed share of queries,
+chosen by hashing the query so runs are repeatable); query expansion prompts
+get the question split on "and"/"with"/"vs", one part per line; every other
+prompt gets a filler answer. Latency, streaming speed and error rate are configurable.
+
+Usage (from backend/):
+    python -m benchmarks.stub_llm --port 9001 --latency-ms 400 --tokens-per-s 60
+    OPENROUTER_BASE_URL=http://localhost:9001/v1 OPENROUTER_API_KEY=stub ...
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ANSWER = (
+    "Based on the provided context, the document describes the requested details. "
+    "The key points are summarized below with the relevant sections cited. "
+) * 4
+
+def create_app(latency_ms: float = 300, jitter_ms: float = 100, tokens_per_s: float = 0,
+               web_search_ratio: float = 0.2, error_rate: float = 0.0, seed: int = 0) -> FastAPI:
+    app = FastAPI(title="Stub LLM")
+    rng = random.Random(seed)
+
+    def routing_decision(messages) -> str:
+        query = messages[-1].get("content", "") if messages else ""
+        bucket = int(hashlib.md5(str(query).encode()).hexdigest(), 16) % 1000
+        return "web_search" if bucket < web_search_ratio * 1000 else "retrieve"
+
+    def is_routing(messages) -> bool:
+        return any("routing agent" in str(m.get("content", "")) for m in messages if m.get("role") == "system")
+
+    def is_expansion(messages) -> bool:
+        return any("search queries" in str(m.get("content", "")) for m in messages if m.get("role") == "system")
+
+    def expansion(messages) -> str:
+        query = str(messages[-1].get("content", "")) if messages else ""
+        return "\n".join(re.split(r"\s+(?:and|with|vs\.?)\s+", query))
+
+    def count_tokens(messages) -> int:
+        return sum(len(str(m.get("content", ""))) for m in messages) // 4
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        model = body.get("model", "stub")
+
+        await asyncio.sleep(max(0.0, rng.gauss(latency_ms, jitter_ms)) / 1000)
+        if rng.random() < error_rate:
+            return JSONResponse({"error": {"message": "Rate limited by stub", "code": 429}}, status_code=429)
+
+        if is_routing(messages):
+            content = routing_decision(messages)
+        elif is_expansion(messages):
+            content = expansion(messages)
+        else:
+            content = ANSWER
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        usage = {
+            "prompt_tokens": count_tokens(messages),
+            "completion_tokens": len(content) // 4,
+            "total_tokens": count_tokens(messages) + len(content) // 4,
+        }
+
+        if not body.get("stream"):
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        async def events():
+            def chunk(delta, finish_reason=None, **extra):
+                data = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                    **extra,
+                }
+                return f"data: {json.dumps(data)}\n\n"
+
+            yield chunk({"role": "assistant", "content": ""})
+            for word in content.split(" "):
+                if tokens_per_s:
+                    await asyncio.sleep(1 / tokens_per_s)
+                yield chunk({"content": word + " "})
+            yield chunk({}, finish_reason="stop")
+            if body.get("stream_options", {}).get("include_usage"):
+                yield f"data: {json.dumps({'id': completion_id, 'object': 'chat.completion.chunk', 'model': model, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "stub", "object": "model"}]}
+
+    return app
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--tokens-per-s", type=float, default=0, help="Streaming speed, 0 streams instantly")
+    parser.add_argument("--web-search-ratio", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    args = parser.parse_args()
+
+    app = create_app(args.latency_ms, args.jitter_ms, args.tokens_per_s, args.web_search_ratio, args.error_rate)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Stand-in for the Serper search API.
+
+Usage (from backend/):
+    python -m benchmarks.stub_serper --port 9002 --latency-ms 250
+    SERPER_BASE_URL=http://localhost:9002 SERPER_API_KEY=stub ...
+"""
+
+import argparse
+import asyncio
+import random
+from fastapi import FastAPI, Request
+
+def create_app(latency_ms: float = 250, jitter_ms: float = 80, results: int = 8, seed: int = 0) -> FastAPI:
+    app = FastAPI(title="Stub Serper")
+    rng = random.Random(seed)
+
+    @app.post("/{search_type}")
+    async def search(search_type: str, request: Request):
+        query = request.query_params.get("q", "")
+        await asyncio.sleep(max(0.0, rng.gauss(latency_ms, jitter_ms)) / 1000)
+        return {
+            "searchParameters": {"q": query, "type": search_type},
+            "organic": [
+                {
+                    "title": f"Result {i + 1} for {query}",
+                    "link": f"https://example.com/{i + 1}",
+                    "snippet": f"Snippet {i + 1}: recent information about {query} from a synthetic source.",
+                    "position": i + 1,
+                }
+                for i in range(results)
+            ],
+        }
+
+    return app
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9002)
+    parser.add_argument("--latency-ms", type=float, default=250)
+    parser.add_argument("--jitter-ms", type=float, default=80)
+    parser.add_argument("--results", type=int, default=8)
+    args = parser.parse_args()
+
+    app = create_app(args.latency_ms, args.jitter_ms, args.results)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
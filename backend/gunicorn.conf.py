@@ -0,0 +1,61 @@
+"""
+Gunicorn settings for the multi-process production server.
+
+The app, embedding model and FAISS index are loaded once in the master and
+inherited by every worker on fork, so N workers do not pay N model loads
+and the index pages are shared copy-on-write. Rate limits and caches go
+through a SQLite file shared by all workers (SHARED_STORE_PATH) and each
+worker picks up indexes saved by the others (INDEX_REFRESH_SECONDS).
+
+Usage (from backend/):
+    WEB_CONCURRENCY=4 gunicorn -c gunicorn.conf.py app.main:app
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
+preload_app = True
+# Chat requests may wait on two LLM calls of up to 60s each
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 180))
+graceful_timeout = 30
+keepalive = 5
+
+# Must be set before the app (and prometheus_client) is imported
+os.environ.setdefault(
+    "SHARED_STORE_PATH",
+    os.path.join(os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_db"), "shared_store.db"),
+)
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "rag-agent-metrics"))
+
+def on_starting(server):
+    # Metrics files from a previous run would be added to this one's totals
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+def when_ready(server):
+    # Runs in the master after the preloaded app is imported, before forking
+    from app.core.startup import warm_up
+
+    server.log.info("Preloading embedding model, vector index and agent before forking workers")
+    warm_up()
+
+def post_fork(server, worker):
+    # Split the CPU between workers instead of every worker using all cores
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return
+    from app.core.config import settings
+
+    threads = settings.EMBEDDING_THREADS or max(1, (os.cpu_count() or 1) // workers)
+    torch.set_num_threads(threads)
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
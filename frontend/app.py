@@ -1,7 +1,7 @@
 import streamlit as st
 import requests
 import uuid
-import json
+import secrets
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -11,6 +11,8 @@ env_path = Path(__file__).parent.parent / ".env"
 load_dotenv(env_path)
 
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+# Sent to the backend, which plans its own deadline to answer within it
+CHAT_TIMEOUT_SECONDS = float(os.getenv("CHAT_TIMEOUT_SECONDS", 60))
 
 st.set_page_config(
     page_title="Agent Raghu",
@@ -32,50 +34,182 @@ st.markdown("""
 # BROWSER STORAGE FUNCTIONS
 # ============================================================================
 
-def inject_storage_script():
-    """Inject JavaScript for browser localStorage management"""
-    script = """
-    <script>
-    function saveChatHistory(sessionId, messages) {
-        const data = {
-            session_id: sessionId,
-            messages: messages,
-            last_updated: new Date().toISOString()
-        };
-        localStorage.setItem('chat_' + sessionId, JSON.stringify(data));
-        
-        let sessions = JSON.parse(localStorage.getItem('chat_sessions') || '[]');
-        if (!sessions.includes(sessionId)) {
-            sessions.push(sessionId);
-            localStorage.setItem('chat_sessions', JSON.stringify(sessions));
-        }
-    }
-    
-    window.saveChatHistory = saveChatHistory;
-    </script>
+# Messages rendered per page; older ones load on demand
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", 20))
+
+# Reads and writes localStorage; frontend/components/browser_storage/index.html
+browser_storage = components.declare_component(
+    "browser_storage", path=str(Path(__file__).parent / "components" / "browser_storage")
+)
+
+def write_browser(op, **args):
     """
-    components.html(script, height=0)
+    Write to localStorage through the browser_storage component. Content is
+    passed as component args rather than inlined into a script, so it cannot
+    break out of it. The write is rendered now and on every rerun until the
+    browser confirms it.
+    """
+    write = {"key": f"browser-storage-{uuid.uuid4().hex}", "args": {"op": op, **args}}
+    st.session_state.browser_writes.append(write)
+    render_write(write)
+
+def render_write(write):
+    if browser_storage(key=write["key"], default=None, **write["args"]) is not None:
+        st.session_state.browser_writes.remove(write)
 
-def save_to_browser(session_id, messages):
-    """Save chat to browser localStorage"""
-    messages_json = json.dumps(messages)
-    js_code = f"""
-    <script>
-    if (window.saveChatHistory) {{
-        window.saveChatHistory('{session_id}', {messages_json});
-    }}
-    </script>
+def save_to_browser(session_id, history_token, messages):
     """
-    components.html(js_code, height=0)
+    Append messages to the browser's localStorage copy of a session and
+    remember it as the one to resume on the next visit.
 
-inject_storage_script()
+    Each message gets its own key, so a turn costs the same no matter how
+    long the conversation is.
+    """
+    write_browser(
+        "append", session_id=session_id, history_token=history_token,
+        messages=messages, start=st.session_state.next_seq
+    )
+    if st.session_state.next_seq is not None:
+        st.session_state.next_seq += len(messages)
 
+def clear_browser(session_id):
+    """Remove a session's messages from browser localStorage"""
+    write_browser("clear", session_id=session_id)
 
-if "session_id" not in st.session_state:
-    st.session_state.session_id = str(uuid.uuid4())
+def request_browser(op, **args):
+    """
+    Queue a localStorage read. poll_browser() renders it; the browser's
+    answer arrives on the rerun it triggers.
+    """
+    st.session_state.browser_request = {"key": f"browser-storage-{uuid.uuid4().hex}", "args": {"op": op, **args}}
+
+def poll_browser():
+    """
+    Render the unconfirmed localStorage writes and the pending read, and
+    apply the read's answer once it has arrived.
+    """
+    for write in list(st.session_state.browser_writes):
+        render_write(write)
+    request = st.session_state.browser_request
+    if request is None:
+        return
+    value = browser_storage(key=request["key"], default=None, **request["args"])
+    if value is None:
+        return
+    st.session_state.browser_request = None
+    if "error" in value:
+        st.warning(f"Could not read browser storage: {value['error']}")
+    elif request["args"]["op"] == "current":
+        # Resume the last conversation unless this visit has already started a new one
+        current = value["current"]
+        if current and not st.session_state.messages:
+            start_session(current["session_id"], current["history_token"], resume=True)
+            poll_browser()
+    elif request["args"]["session_id"] == st.session_state.session_id:
+        if request["args"]["before"] is None:
+            # Messages sent before the newest page arrived were appended
+            # after the stored ones already; the page would duplicate them
+            if st.session_state.persisted:
+                return
+            st.session_state.next_seq = value["total"]
+        prepend_page(value)
+
+def history_headers():
+    """The session's history token; the backend needs it to read the history back"""
+    return {"X-History-Token": st.session_state.history_token}
+
+def fetch_history(session_id, before=None):
+    """
+    One page of the session's history from the backend, or None when the
+    backend does not keep session history.
+    """
+    params = {"limit": HISTORY_PAGE_SIZE}
+    if before is not None:
+        params["before"] = before
+    try:
+        response = requests.get(
+            f"{API_BASE_URL}/api/sessions/{session_id}/messages",
+            params=params, headers=history_headers(), timeout=5
+        )
+    except requests.exceptions.RequestException:
+        return None
+    return response.json() if response.status_code == 200 else None
 
-if "messages" not in st.session_state:
+def prepend_page(page):
+    """Put a page of stored history (oldest first) in front of the loaded messages"""
+    if page["messages"]:
+        st.session_state.messages[:0] = [{"role": m["role"], "content": m["content"]} for m in page["messages"]]
+        st.session_state.persisted += len(page["messages"])
+        st.session_state.first_seq = page["messages"][0]["seq"]
+        st.session_state.has_earlier = page["has_more"]
+    else:
+        st.session_state.has_earlier = False
+
+def start_session(session_id, history_token, resume=False):
+    """
+    Switch to a session, loading the newest page of its history when resuming
+    one: from the server when it keeps history, otherwise from browser storage.
+    The history token is a secret kept out of the URL, so a shared link does
+    not give access to the conversation.
+    """
+    st.session_state.session_id = session_id
+    st.session_state.history_token = history_token
     st.session_state.messages = []
+    st.session_state.first_seq = None
+    st.session_state.has_earlier = False
+    st.session_state.persisted = 0
+    st.session_state.visible = HISTORY_PAGE_SIZE
+    st.session_state.browser_request = None
+    # Next browser storage seq; unknown until a resumed session's page arrives
+    st.session_state.next_seq = None if resume else 0
+
+    page = fetch_history(session_id)
+    st.session_state.server_history = page is not None
+    if page is not None:
+        prepend_page(page)
+    elif resume:
+        request_browser("page", session_id=session_id, before=None, limit=HISTORY_PAGE_SIZE)
+
+def load_earlier():
+    """
+    Show one more page: first from messages already in memory, then from
+    the server or browser storage.
+    """
+    st.session_state.visible += HISTORY_PAGE_SIZE
+    hidden = len(st.session_state.messages) - st.session_state.visible
+    if hidden < 0 and st.session_state.has_earlier:
+        if st.session_state.server_history:
+            page = fetch_history(st.session_state.session_id, before=st.session_state.first_seq)
+            if page is not None:
+                prepend_page(page)
+        else:
+            request_browser(
+                "page", session_id=st.session_state.session_id,
+                before=st.session_state.first_seq, limit=HISTORY_PAGE_SIZE
+            )
+
+def persist_new_messages():
+    """
+    Persist the messages added since the last call. The backend already
+    records successful turns, so with server history the browser only
+    remembers which session (and token) to resume.
+    """
+    new_messages = st.session_state.messages[st.session_state.persisted:]
+    save_to_browser(
+        st.session_state.session_id,
+        st.session_state.history_token,
+        [] if st.session_state.server_history else new_messages
+    )
+    st.session_state.persisted += len(new_messages)
+
+
+if "session_id" not in st.session_state:
+    st.session_state.browser_writes = []
+    start_session(str(uuid.uuid4()), secrets.token_urlsafe(24))
+    # Look up the browser's last conversation to resume
+    request_browser("current")
+
+poll_browser()
 
 if "system_prompt" not in st.session_state:
     st.session_state.system_prompt = """You are Agent Raghu, an AI assistant specifically designed to simplify documents and help people summarize any sort of document.
@@ -106,13 +240,14 @@ with st.sidebar:
     st.title("⚙️ Settings")
     
     st.subheader("Session")
-    st.info("💾 Chat history is stored in your browser")
+    if st.session_state.server_history:
+        st.info("💾 Chat history is stored on the server")
+    else:
+        st.info("💾 Chat history is stored in your browser")
     
     if st.button("➕ New Session", type="primary"):
-        if st.session_state.messages:
-            save_to_browser(st.session_state.session_id, st.session_state.messages)
-        st.session_state.session_id = str(uuid.uuid4())
-        st.session_state.messages = []
+        persist_new_messages()
+        start_session(str(uuid.uuid4()), secrets.token_urlsafe(24))
         st.session_state.uploaded_docs = []
         st.rerun()
     
@@ -180,7 +315,12 @@ with st.sidebar:
 st.title("🤖 Agent Raghu")
 st.caption("Chat with your documents and get real-time information")
 
-for message in st.session_state.messages:
+# Only the newest page is rendered; long conversations stay fast to rerun
+hidden = max(0, len(st.session_state.messages) - st.session_state.visible)
+if hidden or st.session_state.has_earlier:
+    st.button("⬆️ Load earlier messages", on_click=load_earlier)
+
+for message in st.session_state.messages[hidden:]:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
 
@@ -195,39 +335,52 @@ if prompt := st.chat_input("Ask me anything..."):
             try:
                 response = requests.post(
                     f"{API_BASE_URL}/api/chat",
-                    json={"message": prompt, "session_id": st.session_state.session_id},
-                    timeout=60
+                    json={
+                        "message": prompt,
+                        "session_id": st.session_state.session_id,
+                        "history_token": st.session_state.history_token,
+                    },
+                    headers={"X-Request-Timeout": str(CHAT_TIMEOUT_SECONDS)},
+                    timeout=CHAT_TIMEOUT_SECONDS
                 )
                 
                 if response.status_code == 200:
                     ai_response = response.json()["response"]
                     st.markdown(ai_response)
                     st.session_state.messages.append({"role": "assistant", "content": ai_response})
-                    save_to_browser(st.session_state.session_id, st.session_state.messages)
+                    persist_new_messages()
                 else:
                     error_msg = f"Error: {response.json().get('detail', 'Unknown error')}"
                     st.error(error_msg)
                     st.session_state.messages.append({"role": "assistant", "content": error_msg})
-                    save_to_browser(st.session_state.session_id, st.session_state.messages)
+                    persist_new_messages()
             except requests.exceptions.Timeout:
                 error_msg = "Request timed out. Please try again."
                 st.error(error_msg)
                 st.session_state.messages.append({"role": "assistant", "content": error_msg})
-                save_to_browser(st.session_state.session_id, st.session_state.messages)
+                persist_new_messages()
             except Exception as e:
                 error_msg = f"Error: {str(e)}"
                 st.error(error_msg)
                 st.session_state.messages.append({"role": "assistant", "content": error_msg})
-                save_to_browser(st.session_state.session_id, st.session_state.messages)
+                persist_new_messages()
 
 st.divider()
 col1, col2, col3 = st.columns(3)
 with col1:
     st.caption(f"Session: {st.session_state.session_id[:8]}...")
 with col2:
-    st.caption(f"Messages: {len(st.session_state.messages)}")
+    st.caption(f"Messages: {len(st.session_state.messages) + (st.session_state.first_seq or 0)}")
 with col3:
     if st.button("Clear Chat"):
-        st.session_state.messages = []
-        save_to_browser(st.session_state.session_id, st.session_state.messages)
+        if st.session_state.server_history:
+            try:
+                requests.delete(
+                    f"{API_BASE_URL}/api/sessions/{st.session_state.session_id}/messages",
+                    headers=history_headers(), timeout=5
+                )
+            except requests.exceptions.RequestException:
+                pass
+        clear_browser(st.session_state.session_id)
+        start_session(st.session_state.session_id, st.session_state.history_token)
         st.rerun()
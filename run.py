@@ -28,15 +28,30 @@ def main():
     backend_port = int(os.getenv("BACKEND_PORT", 8000))
     frontend_port = int(os.getenv("FRONTEND_PORT", 8501))
     
+    # BACKEND_WORKERS > 0 runs the production server (gunicorn, N workers)
+    # instead of the single auto-reloading development worker
+    backend_workers = int(os.getenv("BACKEND_WORKERS", 0))
+    
     # Start FastAPI backend
-    print(f"\n🚀 Starting FastAPI backend on port {backend_port}...")
-    backend_process = subprocess.Popen([
-        PYTHON_EXEC, "-m", "uvicorn",
-        "app.main:app",
-        "--host", "0.0.0.0",
-        "--port", str(backend_port),
-        "--reload"
-    ], cwd=PROJECT_ROOT / "backend")
+    if backend_workers:
+        print(f"\n🚀 Starting FastAPI backend on port {backend_port} with {backend_workers} workers...")
+        backend_env = os.environ.copy()
+        backend_env["PORT"] = str(backend_port)
+        backend_env["WEB_CONCURRENCY"] = str(backend_workers)
+        backend_process = subprocess.Popen([
+            PYTHON_EXEC, "-m", "gunicorn",
+            "-c", "gunicorn.conf.py",
+            "app.main:app"
+        ], cwd=PROJECT_ROOT / "backend", env=backend_env)
+    else:
+        print(f"\n🚀 Starting FastAPI backend on port {backend_port}...")
+        backend_process = subprocess.Popen([
+            PYTHON_EXEC, "-m", "uvicorn",
+            "app.main:app",
+            "--host", "0.0.0.0",
+            "--port", str(backend_port),
+            "--reload"
+        ], cwd=PROJECT_ROOT / "backend")
     
     print(f"✅ Backend started (PID: {backend_process.pid})")
     